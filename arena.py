@@ -0,0 +1,373 @@
+from typing import Optional, List, Dict, Tuple, Sequence, Iterable, Any, cast
+from array import array
+from enum import Enum, auto
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import lex
+import parse
+
+class NodeKind(Enum):
+    IDENTIFIER = auto()
+    LEAF = auto()
+    UNARY = auto()
+    BINARY = auto()
+    BLOCK = auto()
+    FUNCTION_CALL = auto()
+    IF = auto()
+    FUNCTION_DEF = auto()
+    WRAPPER = auto()
+    LET = auto()
+    RETURN = auto()
+
+NODE_KINDS: Dict[int, NodeKind] = {kind.value: kind for kind in NodeKind}
+LEAF_KINDS: Dict[int, parse.Leaf.Kind] = {kind.value: kind for kind in parse.Leaf.Kind}
+UNARY_OPERATIONS: Dict[int, parse.Unary.Operation] = {operation.value: operation for operation in parse.Unary.Operation}
+BINARY_OPERATIONS: Dict[int, parse.Binary.Operation] = {operation.value: operation for operation in parse.Binary.Operation}
+NODE_CLASSES: Dict[NodeKind, type] = {
+    NodeKind.IDENTIFIER: parse.Identifier,
+    NodeKind.LEAF: parse.Leaf,
+    NodeKind.UNARY: parse.Unary,
+    NodeKind.BINARY: parse.Binary,
+    NodeKind.BLOCK: parse.Block,
+    NodeKind.FUNCTION_CALL: parse.FunctionCall,
+    NodeKind.IF: parse.If,
+    NodeKind.FUNCTION_DEF: parse.FunctionDef,
+    NodeKind.WRAPPER: parse.Wrapper,
+    NodeKind.LET: parse.Let,
+    NodeKind.RETURN: parse.Return,
+}
+
+# an AST stored as parallel columns, one row per node. Rows are appended
+# children first, so a node's children always have smaller indices and a
+# whole-tree traversal is a loop over range(len(arena)). Per kind:
+#   IDENTIFIER     literal = name
+#   LEAF           operation = Leaf.Kind, literal = value
+#   UNARY          operation, first = operand
+#   BINARY         operation, first = left, second = right
+#   BLOCK          (start, count) of its statements in extra
+#   FUNCTION_CALL  first = callee, (start, count) of its arguments in extra
+#   IF             (start, count) in extra of main condition and block,
+#                  alternative condition/block pairs and the fallback block;
+#                  operation is 1 when there is a fallback
+#   FUNCTION_DEF   literal = name, first = body, (start, count) of argument
+#                  name literals in extra
+#   WRAPPER        first = value
+#   LET            literal = identifier, first = value
+#   RETURN         first = value or -1
+class Arena:
+    def __init__(self):
+        self.kinds = array('B')
+        self.operations = array('B')
+        self.firsts = array('i')
+        self.seconds = array('i')
+        self.starts = array('i')
+        self.counts = array('i')
+        self.literal_indices = array('i')
+        self.offsets = array('q')
+        self.extra = array('i')
+        self.literals: List[Any] = []
+        # one table per literal type, so that 1, 1.0 and true stay apart
+        self.interned: Dict[type, Dict[Any, int]] = {}
+        self.roots = array('i')
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def literal(self, value: Any) -> int:
+        if (interned := self.interned.get(type(value))) is None:
+            interned = self.interned[type(value)] = {}
+        if (index := interned.get(value)) is None:
+            index = interned[value] = len(self.literals)
+            self.literals.append(value)
+        return index
+
+    def append(self, kind: NodeKind, offset: Optional[int], operation: int=0, first: int=-1, second: int=-1, extra: Iterable[int]=(), literal: int=-1) -> int:
+        start = len(self.extra)
+        self.extra.extend(extra)
+        self.kinds.append(kind.value)
+        self.operations.append(operation)
+        self.firsts.append(first)
+        self.seconds.append(second)
+        self.starts.append(start)
+        self.counts.append(len(self.extra) - start)
+        self.literal_indices.append(literal)
+        self.offsets.append(offset if offset is not None else -1)
+        return len(self.kinds) - 1
+
+    def add(self, node: parse.Node, indices: Dict[int, int]) -> int:
+        index = lambda child: indices[id(child)]
+        match type(node):
+            case parse.Identifier:
+                identifier = cast(parse.Identifier, node)
+                return self.append(NodeKind.IDENTIFIER, node.offset, literal=self.literal(identifier.value))
+            case parse.Leaf:
+                leaf = cast(parse.Leaf, node)
+                return self.append(NodeKind.LEAF, node.offset, leaf.kind.value, literal=self.literal(leaf.value))
+            case parse.Unary:
+                unary = cast(parse.Unary, node)
+                return self.append(NodeKind.UNARY, node.offset, unary.operation.value, index(unary.value))
+            case parse.Binary:
+                binary = cast(parse.Binary, node)
+                return self.append(NodeKind.BINARY, node.offset, binary.operation.value, index(binary.left), index(binary.right))
+            case parse.Block:
+                return self.append(NodeKind.BLOCK, node.offset, extra=map(index, parse.children(node)))
+            case parse.FunctionCall:
+                call = cast(parse.FunctionCall, node)
+                return self.append(NodeKind.FUNCTION_CALL, node.offset, first=index(call.callee), extra=map(index, call.arguments))
+            case parse.If:
+                fallback = int(cast(parse.If, node).fallback is not None)
+                return self.append(NodeKind.IF, node.offset, fallback, extra=map(index, parse.children(node)))
+            case parse.FunctionDef:
+                definition = cast(parse.FunctionDef, node)
+                arguments = [self.literal(argument) for argument in definition.arguments]
+                return self.append(NodeKind.FUNCTION_DEF, node.offset, first=index(definition.body), extra=arguments, literal=self.literal(definition.name))
+            case parse.Wrapper:
+                return self.append(NodeKind.WRAPPER, node.offset, first=index(cast(parse.Wrapper, node).value))
+            case parse.Let:
+                let = cast(parse.Let, node)
+                return self.append(NodeKind.LET, node.offset, first=index(let.value), literal=self.literal(let.identifier))
+            case parse.Return:
+                value = cast(parse.Return, node).value
+                return self.append(NodeKind.RETURN, node.offset, first=index(value) if value is not None else -1)
+            case _:
+                raise ValueError(f'UNREACHABLE [{node}] @ Arena.add')
+
+    # appends one statement; the walk is iterative, so trees from
+    # parse.IterativeParser of any depth fit
+    def add_statement(self, statement: parse.Statement) -> int:
+        order = []
+        pending: List[parse.Node] = [statement]
+        while pending:
+            node = pending.pop()
+            order.append(node)
+            pending.extend(parse.children(node))
+        indices: Dict[int, int] = {}
+        for node in reversed(order):
+            indices[id(node)] = self.add(node, indices)
+        root = indices[id(statement)]
+        self.roots.append(root)
+        return root
+
+    # appends the rows of another arena after this one's, as when joining
+    # arenas parsed from consecutive slices of a program; other's row, extra
+    # and literal indices are moved to where its rows and literals land
+    def extend(self, other: 'Arena'):
+        base, extra_base = len(self), len(self.extra)
+        literals = [self.literal(value) for value in other.literals]
+        extra = array('i', [index + base for index in other.extra])
+        # FUNCTION_DEF rows list argument literals in extra, not rows
+        definition = NodeKind.FUNCTION_DEF.value
+        for row in [row for row, kind in enumerate(other.kinds) if kind == definition]:
+            start = other.starts[row]
+            for position in range(start, start + other.counts[row]):
+                extra[position] = literals[other.extra[position]]
+        self.kinds.extend(other.kinds)
+        self.operations.extend(other.operations)
+        self.firsts.extend(array('i', [index + base if index != -1 else -1 for index in other.firsts]))
+        self.seconds.extend(array('i', [index + base if index != -1 else -1 for index in other.seconds]))
+        self.starts.extend(array('i', [start + extra_base for start in other.starts]))
+        self.counts.extend(other.counts)
+        self.literal_indices.extend(array('i', [literals[index] if index != -1 else -1 for index in other.literal_indices]))
+        self.offsets.extend(other.offsets)
+        self.extra.extend(extra)
+        self.roots.extend(array('i', [root + base for root in other.roots]))
+
+    def view(self, index: int) -> 'NodeView':
+        return NodeView(self, index)
+
+    def statements(self) -> List['NodeView']:
+        return [NodeView(self, root) for root in self.roots]
+
+    # rebuilds ordinary parse nodes, for code that needs node objects
+    # rather than views
+    def build_tree(self) -> List[parse.Statement]:
+        nodes: List[Optional[parse.Node]] = [None] * len(self)
+        for index in range(len(self)):
+            nodes[index] = self.materialize(index, nodes)
+        return [cast(parse.Statement, nodes[root]) for root in self.roots]
+
+    def materialize(self, index: int, nodes: List[Optional[parse.Node]]) -> parse.Node:
+        first, literal = self.firsts[index], self.literal_indices[index]
+        extra = [nodes[child] for child in self.extra[self.starts[index]:self.starts[index] + self.counts[index]]]
+        node: parse.Node
+        match NODE_KINDS[self.kinds[index]]:
+            case NodeKind.IDENTIFIER:
+                node = parse.Identifier(self.literals[literal])
+            case NodeKind.LEAF:
+                node = parse.Leaf.__new__(parse.Leaf)
+                node.kind = LEAF_KINDS[self.operations[index]]
+                node.value = self.literals[literal]
+            case NodeKind.UNARY:
+                node = parse.Unary(UNARY_OPERATIONS[self.operations[index]], cast(parse.Expression, nodes[first]))
+            case NodeKind.BINARY:
+                node = parse.Binary(cast(parse.Expression, nodes[first]), BINARY_OPERATIONS[self.operations[index]], cast(parse.Expression, nodes[self.seconds[index]]))
+            case NodeKind.BLOCK:
+                node = parse.Block(cast(List[parse.Statement], extra))
+            case NodeKind.FUNCTION_CALL:
+                node = parse.FunctionCall(cast(parse.Expression, nodes[first]), cast(List[parse.Expression], extra))
+            case NodeKind.IF:
+                fallback = cast(parse.Block, extra.pop()) if self.operations[index] else None
+                pairs = cast(List[Any], extra)
+                alternatives = {pairs[position]: pairs[position + 1] for position in range(2, len(pairs), 2)}
+                node = parse.If((pairs[0], pairs[1]), alternatives, fallback)
+            case NodeKind.FUNCTION_DEF:
+                arguments = [self.literals[argument] for argument in self.extra[self.starts[index]:self.starts[index] + self.counts[index]]]
+                node = parse.FunctionDef(self.literals[literal], arguments, cast(parse.Block, nodes[first]))
+            case NodeKind.WRAPPER:
+                node = parse.Wrapper(cast(parse.Expression, nodes[first]))
+            case NodeKind.LET:
+                node = parse.Let(self.literals[literal], cast(parse.Expression, nodes[first]))
+            case NodeKind.RETURN:
+                node = parse.Return(cast(parse.Expression, nodes[first]) if first != -1 else None)
+        offset = self.offsets[index]
+        node.offset = offset if offset != -1 else None
+        return node
+
+    @classmethod
+    def from_tree(cls, tree: Iterable[parse.Statement]) -> 'Arena':
+        arena = cls()
+        for statement in tree:
+            arena.add_statement(statement)
+        return arena
+
+    # parses straight into an arena, so only one statement's node objects
+    # are alive at a time
+    @classmethod
+    def parse(cls, tokens: List[lex.Token], parser: type=parse.Parser) -> 'Arena':
+        return cls.from_tree(parser(tokens).statements())
+
+def parse_slice(tokens: List[lex.PackedToken], parser: type) -> Arena:
+    return Arena.parse(lex.unpack_tokens(tokens), parser)
+
+# parses runs of whole top-level statements in a process pool and joins
+# their arenas in source order. Workers send back arenas rather than parse
+# nodes, since a few flat arrays unpickle in a fraction of the time a tree
+# of node objects does; codegen lowers the arena's statements() as it does
+# nodes. The first error raised is the one a serial parse would raise,
+# since every slice starts on a statement boundary
+def parse_parallel(tokens: Sequence[lex.Token], workers: Optional[int]=None, slice_size: int=1 << 14, parser: type=parse.Parser) -> Arena:
+    workers = workers or os.cpu_count() or 1
+    size = max(slice_size, -(-len(tokens) // (workers * 4)))
+    points = [0]
+    for boundary in parse.statement_boundaries(tokens):
+        if boundary - points[-1] >= size:
+            points.append(boundary)
+    if points[-1] != len(tokens):
+        points.append(len(tokens))
+    if len(points) <= 2:
+        return Arena.parse(list(tokens), parser)
+    arena = Arena()
+    with ProcessPoolExecutor(workers) as pool:
+        slices = (lex.pack_tokens(tokens[start:end]) for start, end in zip(points, points[1:]))
+        for part in pool.map(parse_slice, slices, [parser] * (len(points) - 1)):
+            arena.extend(part)
+    return arena
+
+# a read-only handle on one arena row that answers the same attribute names
+# as the matching parse node, so codegen.Codegen lowers views as it does
+# nodes; child nodes come back as further views. The row's own tag is
+# node_kind, since kind is Leaf.kind
+class NodeView:
+    __slots__ = ('arena', 'index')
+
+    def __init__(self, arena: Arena, index: int):
+        self.arena = arena
+        self.index = index
+
+    @property
+    def node_kind(self) -> NodeKind:
+        return NODE_KINDS[self.arena.kinds[self.index]]
+
+    # the parse class the row stands for
+    @property
+    def node_class(self) -> type:
+        return NODE_CLASSES[self.node_kind]
+
+    @property
+    def kind(self) -> parse.Leaf.Kind:
+        if self.node_kind != NodeKind.LEAF:
+            raise AttributeError('kind')
+        return LEAF_KINDS[self.arena.operations[self.index]]
+
+    @property
+    def offset(self) -> Optional[int]:
+        offset = self.arena.offsets[self.index]
+        return offset if offset != -1 else None
+
+    def child(self, index: int) -> Optional['NodeView']:
+        return NodeView(self.arena, index) if index != -1 else None
+
+    def nested(self) -> List['NodeView']:
+        start = self.arena.starts[self.index]
+        return [NodeView(self.arena, child) for child in self.arena.extra[start:start + self.arena.counts[self.index]]]
+
+    @property
+    def value(self) -> Any:
+        match self.node_kind:
+            case NodeKind.IDENTIFIER | NodeKind.LEAF:
+                return self.arena.literals[self.arena.literal_indices[self.index]]
+            case _:
+                return self.child(self.arena.firsts[self.index])
+
+    @property
+    def operation(self) -> Any:
+        match self.node_kind:
+            case NodeKind.UNARY:
+                return UNARY_OPERATIONS[self.arena.operations[self.index]]
+            case NodeKind.BINARY:
+                return BINARY_OPERATIONS[self.arena.operations[self.index]]
+            case _:
+                raise AttributeError('operation')
+
+    @property
+    def left(self) -> Optional['NodeView']:
+        return self.child(self.arena.firsts[self.index])
+
+    @property
+    def right(self) -> Optional['NodeView']:
+        return self.child(self.arena.seconds[self.index])
+
+    @property
+    def callee(self) -> Optional['NodeView']:
+        return self.child(self.arena.firsts[self.index])
+
+    @property
+    def body(self) -> Any:
+        if self.node_kind == NodeKind.FUNCTION_DEF:
+            return self.child(self.arena.firsts[self.index])
+        return self.nested()
+
+    @property
+    def arguments(self) -> List[Any]:
+        if self.node_kind == NodeKind.FUNCTION_DEF:
+            start = self.arena.starts[self.index]
+            return [self.arena.literals[argument] for argument in self.arena.extra[start:start + self.arena.counts[self.index]]]
+        return self.nested()
+
+    @property
+    def main(self) -> Tuple['NodeView', 'NodeView']:
+        nested = self.nested()
+        return nested[0], nested[1]
+
+    @property
+    def alternatives(self) -> Dict['NodeView', 'NodeView']:
+        nested = self.nested()
+        if self.arena.operations[self.index]:
+            nested.pop()
+        return {nested[position]: nested[position + 1] for position in range(2, len(nested), 2)}
+
+    @property
+    def fallback(self) -> Optional['NodeView']:
+        return self.nested()[-1] if self.arena.operations[self.index] else None
+
+    @property
+    def name(self) -> str:
+        return self.arena.literals[self.arena.literal_indices[self.index]]
+
+    @property
+    def identifier(self) -> str:
+        return self.arena.literals[self.arena.literal_indices[self.index]]
+
+    def __repr__(self) -> str:
+        return f'NodeView[{self.node_kind} @ {self.index}]'
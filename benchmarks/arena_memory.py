@@ -0,0 +1,28 @@
+# AST memory benchmark: compares traced bytes per node of an ordinary
+# parse tree against the same program held in an arena.Arena.
+#
+#   python -m benchmarks.arena_memory --scale 20
+
+import argparse
+
+import lex
+import parse
+import arena
+from benchmarks.corpus import CORPORA
+from benchmarks.pipeline import traced
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=int, default=20)
+    args = parser.parse_args()
+    print(f'{"corpus":>15} {"nodes":>9} {"tree B/node":>12} {"arena B/node":>13}')
+    for name, generate in sorted(CORPORA.items()):
+        tokens = lex.RegexLexer(generate(args.scale)).build_tokens()
+        tree, tree_bytes, _ = traced(lambda: parse.Parser(tokens).build_tree())
+        del tree
+        nodes, arena_bytes, _ = traced(lambda: arena.Arena.parse(tokens))
+        count = len(nodes)
+        print(f'{name:>15} {count:>9} {tree_bytes / count:>12.1f} {arena_bytes / count:>13.1f}')
+
+if __name__ == '__main__':
+    main()
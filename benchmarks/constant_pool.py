@@ -0,0 +1,32 @@
+# Constant pool benchmark: lowers a program that repeats a small set of
+# literals many times and checks codegen.Codegen keeps one data entry per
+# distinct literal, reporting the cost per emitted literal.
+#
+#   python -m benchmarks.constant_pool --literals 100000 --distinct 100
+
+import argparse
+import time
+
+import lex
+import parse
+import codegen
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--literals', type=int, default=100000)
+    parser.add_argument('--distinct', type=int, default=100)
+    args = parser.parse_args()
+    # 1, 1.0 and true stay separate entries although they compare equal
+    values = [f'{index}' if index % 3 == 0 else f'{index}.0' if index % 3 == 1 else f'"text {index}"' for index in range(args.distinct - 1)] + ['true']
+    source = ''.join(f'let value_{index} = {values[index % len(values)]};\n' for index in range(args.literals))
+    tree = parse.Parser(lex.RegexLexer(source).build_tokens()).build_tree()
+    start = time.perf_counter()
+    data, _ = codegen.Codegen(tree).build_bytecode()
+    elapsed = time.perf_counter() - start
+    # every let also adds its own name
+    names = args.literals
+    assert len(data) == len(values) + names, (len(data), len(values) + names)
+    print(f'{args.literals} literals: {len(data) - names} pool entries for literals, {elapsed / args.literals * 1e6:.2f}us per let')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# Synthetic programs for the pipeline benchmarks, each built only from the
+# grammar parse.Parser accepts and stressing one shape of input.
+
+from typing import Callable, Dict
+
+def nesting(scale: int) -> str:
+    # the recursive parser uses a few frames per level, so depth stays
+    # well under the default recursion limit
+    depth = 150
+    parts = []
+    for index in range(scale):
+        grouped = '(' * depth + str(index) + ')' * depth
+        negated = '-' * depth + 'value'
+        chained = ' + ('.join(f'x_{level}' for level in range(depth)) + ')' * (depth - 1)
+        parts.append(f'let grouped_{index} = {grouped};\nlet negated_{index} = {negated};\nlet chained_{index} = {chained};\n')
+    return ''.join(parts)
+
+def elseif_chains(scale: int) -> str:
+    parts = []
+    for index in range(scale):
+        branches = ' '.join(f'elseif value == {branch} {{ return "branch_{branch}"; }}' for branch in range(1, 200))
+        parts.append(f'if value == 0 {{ return "branch_0"; }} {branches} else {{ return "none"; }};\n')
+    return ''.join(parts)
+
+def functions(scale: int) -> str:
+    return ''.join(
+        f'fn function_{index}(a, b, c) {{\n'
+        f'    let total = a * {index} + b / 2.5 - c % 3;\n'
+        f'    if total >= 10 && !(a != b) {{ return helper_{index}(total, "done"); }};\n'
+        f'    return total;\n'
+        f'}};\n'
+        for index in range(scale * 100)
+    )
+
+def literal_tables(scale: int) -> str:
+    parts = []
+    for index in range(scale * 100):
+        parts.append(f'let text_{index} = "{"lorem ipsum " * (index % 50)}entry {index}";\n')
+        parts.append(f'let number_{index} = {index * 7919 % 100003}.{index % 1000};\n')
+        parts.append(f'let count_{index} = {index};\n')
+    return ''.join(parts)
+
+CORPORA: Dict[str, Callable[[int], str]] = {
+    'nesting': nesting,
+    'elseif_chains': elseif_chains,
+    'functions': functions,
+    'literal_tables': literal_tables,
+}
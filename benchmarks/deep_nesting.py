@@ -0,0 +1,65 @@
+# Deep nesting stress run: parses expressions nested up to --depth levels
+# with parse.IterativeParser and checks the shape of each resulting tree
+# without recursing over it.
+#
+#   python -m benchmarks.deep_nesting --depth 1000000
+
+from typing import Callable, Dict, Tuple
+import argparse
+import time
+
+import lex
+import parse
+
+def grouped(depth: int) -> str:
+    return 'let a = ' + '(' * depth + 'x' + ')' * depth + ';'
+
+def negated(depth: int) -> str:
+    return 'let a = ' + '-' * depth + 'x;'
+
+def right_nested(depth: int) -> str:
+    return 'let a = ' + 'x + (' * depth + 'x' + ')' * depth + ';'
+
+def left_chained(depth: int) -> str:
+    return 'let a = x' + ' * x' * depth + ';'
+
+def calls(depth: int) -> str:
+    return 'let a = ' + 'f(' * depth + 'x' + ')' * depth + ';'
+
+# how to step from a node to its nested child and which class each level has
+SHAPES: Dict[str, Tuple[Callable[[int], str], type, Callable[[parse.Expression], parse.Expression]]] = {
+    'grouped': (grouped, parse.Identifier, lambda node: node),
+    'negated': (negated, parse.Unary, lambda node: node.value),
+    'right_nested': (right_nested, parse.Binary, lambda node: node.right),
+    'left_chained': (left_chained, parse.Binary, lambda node: node.left),
+    'calls': (calls, parse.FunctionCall, lambda node: node.arguments[0]),
+}
+
+def depth_of(node: parse.Expression, kind: type, child: Callable[[parse.Expression], parse.Expression]) -> int:
+    depth = 0
+    while type(node) is kind and kind is not parse.Identifier:
+        node = child(node)
+        depth += 1
+    assert isinstance(node, parse.Identifier) and node.value == 'x'
+    return depth
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--depth', type=int, default=1000000)
+    args = parser.parse_args()
+    depth = 1
+    while True:
+        for name, (generate, kind, child) in SHAPES.items():
+            tokens = lex.RegexLexer(generate(depth)).build_tokens()
+            start = time.perf_counter()
+            tree = parse.IterativeParser(tokens).build_tree()
+            elapsed = time.perf_counter() - start
+            expected = 0 if kind is parse.Identifier else depth
+            assert depth_of(tree[0].value, kind, child) == expected, name
+            print(f'{name:>13} {depth:>9} levels {elapsed:>8.3f}s')
+        if depth == args.depth:
+            break
+        depth = min(depth * 10, args.depth)
+
+if __name__ == '__main__':
+    main()
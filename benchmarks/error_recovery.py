@@ -0,0 +1,50 @@
+# Error recovery benchmark: parses each corpus with parse.Parser and
+# parse.RecoveringParser to check the error-free path gives the same tree
+# at the same speed, then breaks every --every-th statement of the functions
+# corpus and checks one recovering pass reports each break.
+#
+#   python -m benchmarks.error_recovery --scale 20 --every 10
+
+from typing import List, Tuple, cast
+import argparse
+import time
+
+import lex
+import parse
+from benchmarks.corpus import CORPORA, functions
+
+def timed(parser: type, tokens: List[lex.Token]) -> Tuple[List[parse.Statement], float]:
+    start = time.perf_counter()
+    tree = parser(tokens).build_tree()
+    return tree, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=int, default=20)
+    parser.add_argument('--every', type=int, default=10)
+    args = parser.parse_args()
+    for name, generate in CORPORA.items():
+        tokens = lex.RegexLexer(generate(args.scale)).build_tokens()
+        plain, plain_seconds = timed(parse.Parser, tokens)
+        recovered, recovering_seconds = timed(parse.RecoveringParser, tokens)
+        assert repr(plain) == repr(recovered)
+        print(f'{name:>14}: Parser {plain_seconds:.3f}s, RecoveringParser {recovering_seconds:.3f}s ({recovering_seconds / plain_seconds:.2f}x)')
+    # dropping the '=' of every broken let leaves exactly one error in it
+    definitions = functions(args.scale).split('\n}')
+    broken = [part.replace('let total =', 'let total', 1) if index % args.every == 0 else part for index, part in enumerate(definitions)]
+    tokens = lex.RegexLexer('\n}'.join(broken)).build_tokens()
+    recovering = parse.RecoveringParser(tokens)
+    tree = recovering.build_tree()
+    expected = sum(1 for part in broken if 'let total ' in part and 'let total =' not in part)
+    assert len(recovering.errors) == expected, (len(recovering.errors), expected)
+    assert len(tree) == len(definitions) - 1
+    print(f'{expected} broken statements: {len(recovering.errors)} errors reported, {len(tree)} statements kept')
+    # an error inside a block expression resynchronises within the block
+    recovering = parse.RecoveringParser(lex.RegexLexer('let x = { 1 +; 2; }; let y = 3;').build_tokens())
+    tree = recovering.build_tree()
+    assert len(recovering.errors) == 1, recovering.errors
+    assert [type(statement) for statement in tree] == [parse.Let, parse.Let], tree
+    assert len(cast(parse.Block, cast(parse.Let, tree[0]).value).body) == 1
+
+if __name__ == '__main__':
+    main()
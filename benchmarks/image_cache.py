@@ -0,0 +1,48 @@
+# Image cache benchmark: writes a project of source files, then loads every
+# file through cache.ImageCache cold, warm, and after editing one file,
+# under each invalidation mode, reporting the time per pass.
+#
+#   python -m benchmarks.image_cache --files 200 --scale 1
+
+from typing import List
+import argparse
+import os
+import tempfile
+import time
+
+import cache
+from benchmarks.corpus import functions
+
+def load_all(images: cache.ImageCache, paths: List[str]) -> float:
+    start = time.perf_counter()
+    for path in paths:
+        images.load(path).close()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--scale', type=int, default=1)
+    args = parser.parse_args()
+    source = functions(args.scale)
+    print(f'{"invalidation":>15} {"cold":>9} {"warm":>9} {"one edit":>9}')
+    for invalidation in cache.Invalidation:
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, f'module_{index}.tc') for index in range(args.files)]
+            for path in paths:
+                with open(path, 'w') as file:
+                    file.write(source)
+            images = cache.ImageCache(invalidation)
+            cold = load_all(images, paths)
+            warm = load_all(images, paths)
+            assert images.statistics() == {'hits': args.files, 'misses': args.files}
+            with open(paths[0], 'a') as file:
+                file.write('let edited = 1;\n')
+            edited = load_all(images, paths)
+            # an unchecked hash never notices the edit
+            expected = 0 if invalidation == cache.Invalidation.UNCHECKED_HASH else 1
+            assert images.misses == args.files + expected, images.statistics()
+            print(f'{invalidation.name.lower():>15} {cold * 1e3:>7.1f}ms {warm * 1e3:>7.1f}ms {edited * 1e3:>7.1f}ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# Image loading benchmark: compiles the functions corpus at growing scales,
+# writes each as an image.Image and as pickled bytecode.Bytecode, and
+# reports the time to open each and read its first instruction and constant.
+#
+#   python -m benchmarks.image_loading --scales 1 10 100
+
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+import compiler
+import image
+from benchmarks.corpus import functions
+
+def load_pickle(path: str):
+    with open(path, 'rb') as file:
+        data, code = pickle.load(file)
+    return data[0], code[0]
+
+def load_image(path: str):
+    with image.Image(path) as loaded:
+        return loaded.data[0], loaded.code[0]
+
+def timed(load, path: str, repeat: int) -> float:
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load(path)
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(f'{"scale":>6} {"instructions":>13} {"pickle B":>10} {"image B":>10} {"pickle load":>12} {"image open":>11}')
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scales:
+            program = compiler.compile(functions(scale))
+            pickled = os.path.join(directory, f'{scale}.pickle')
+            mapped = os.path.join(directory, f'{scale}.tcb')
+            with open(pickled, 'wb') as file:
+                pickle.dump(program, file, pickle.HIGHEST_PROTOCOL)
+            image.write(mapped, program)
+            with image.Image(mapped) as loaded:
+                assert loaded.program() == program
+                assert load_image(mapped) == (program[0][0], program[1][0].value)
+            pickle_seconds = timed(load_pickle, pickled, args.repeat)
+            image_seconds = timed(load_image, mapped, args.repeat)
+            print(f'{scale:>6} {len(program[1]):>13} {os.path.getsize(pickled):>10} {os.path.getsize(mapped):>10} '
+                  f'{pickle_seconds * 1e3:>10.2f}ms {image_seconds * 1e3:>9.3f}ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+# Incremental lexing benchmark: applies random single-character edits to a
+# synthetic source through lex.IncrementalLexer and compares the cost per
+# edit against lexing the whole edited source again.
+#
+#   python -m benchmarks.incremental_lexing --mb 1 --edits 1000
+
+import argparse
+import random
+import time
+
+import lex
+from benchmarks.lexer_scaling import generate
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mb', type=int, default=1)
+    parser.add_argument('--edits', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    source = generate(args.mb * 1024 * 1024)
+    lexer = lex.IncrementalLexer(source)
+    elapsed = 0.0
+    for _ in range(args.edits):
+        # retyping an existing identifier character keeps the source valid
+        offset = rng.randrange(len(lexer.input))
+        while not lexer.input[offset].isalpha():
+            offset = rng.randrange(len(lexer.input))
+        start = time.perf_counter()
+        lexer.edit(offset, 1, 'q')
+        elapsed += time.perf_counter() - start
+    start = time.perf_counter()
+    expected = lex.RegexLexer(lexer.input).build_tokens()
+    full = time.perf_counter() - start
+    actual = lexer.build_tokens()
+    assert [(token.type, token.literal, token.offset) for token in actual] == [(token.type, token.literal, token.offset) for token in expected]
+    print(f'{len(actual)} tokens: {elapsed / args.edits * 1e6:.1f}us per incremental edit, {full * 1e3:.1f}ms per full re-lex')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# Incremental parsing benchmark: applies random single-digit edits to a
+# generated library of fn definitions through parse.IncrementalParser,
+# checks the result against a full parse of the edited source and reports
+# the cost per edit against parsing the whole source again.
+#
+#   python -m benchmarks.incremental_parsing --functions 10000 --edits 200
+
+import argparse
+import random
+import time
+
+import lex
+import parse
+from benchmarks.corpus import functions
+
+def offsets(tree: list) -> list:
+    found = []
+    pending = list(reversed(tree))
+    while pending:
+        node = pending.pop()
+        found.append(node.offset)
+        pending.extend(reversed(parse.children(node)))
+    return found
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--functions', type=int, default=10000)
+    parser.add_argument('--edits', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    incremental = parse.IncrementalParser(functions(args.functions // 100))
+    original = list(incremental.statements)
+    elapsed = 0.0
+    for _ in range(args.edits):
+        # any digit for any other keeps the source valid
+        offset = rng.randrange(len(incremental.lexer.input))
+        while not incremental.lexer.input[offset].isdigit():
+            offset = rng.randrange(len(incremental.lexer.input))
+        start = time.perf_counter()
+        incremental.edit(offset, 1, str(rng.randrange(10)))
+        elapsed += time.perf_counter() - start
+    source = incremental.lexer.input
+    start = time.perf_counter()
+    expected = parse.Parser(lex.RegexLexer(source).build_tokens()).build_tree()
+    full = time.perf_counter() - start
+    actual = incremental.build_tree()
+    assert repr(actual) == repr(expected)
+    assert offsets(actual) == offsets(expected)
+    kept = len({id(statement) for statement in original} & {id(statement) for statement in actual})
+    print(f'{source.count(chr(10))} lines: {elapsed / args.edits * 1e3:.2f}ms per incremental edit, {full * 1e3:.1f}ms per full parse, {kept}/{len(actual)} statements kept')
+
+if __name__ == '__main__':
+    main()
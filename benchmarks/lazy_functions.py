@@ -0,0 +1,35 @@
+# Lazy function body benchmark: parses a library of many fn definitions
+# eagerly and with parse.LazyParser, then forces a small share of the lazy
+# bodies the way a run that calls only a few functions would.
+#
+#   python -m benchmarks.lazy_functions --functions 10000 --used 0.01
+
+import argparse
+import time
+
+import lex
+import parse
+from benchmarks.corpus import functions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--functions', type=int, default=10000)
+    parser.add_argument('--used', type=float, default=0.01)
+    args = parser.parse_args()
+    tokens = lex.RegexLexer(functions(args.functions // 100)).build_tokens()
+    start = time.perf_counter()
+    eager = parse.Parser(tokens).build_tree()
+    eager_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    lazy = parse.LazyParser(tokens).build_tree()
+    skim_seconds = time.perf_counter() - start
+    used = lazy[::max(1, round(1 / args.used))] if args.used > 0 else []
+    start = time.perf_counter()
+    for definition in used:
+        definition.body
+    force_seconds = time.perf_counter() - start
+    assert [repr(definition) for definition in used] == [repr(eager[lazy.index(definition)]) for definition in used]
+    print(f'{len(lazy)} functions: eager {eager_seconds:.3f}s, lazy pre-parse {skim_seconds:.3f}s + {len(used)} bodies {force_seconds:.3f}s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# Lexer scaling benchmark: lexes synthetic sources of doubling size and
+# reports throughput per engine, which should stay flat if lexing is linear.
+#
+#   python -m benchmarks.lexer_scaling --max-mb 100 --engines regex scan
+
+from typing import Iterator, Tuple
+import argparse
+import time
+
+import lex
+
+SNIPPET = '''fn {name}(a, b) {{
+    let {name}_total = a * {number} + b / 2.5;
+    if {name}_total >= 10 && !b {{
+        return "{text}";
+    }} elseif a != b {{
+        return {name}_total % 3;
+    }};
+    return {name}_total;
+}};
+'''
+
+def generate(size: int) -> str:
+    parts = []
+    length = 0
+    index = 0
+    while length < size:
+        # lexemes get longer with the index so quadratic behaviour shows up
+        part = SNIPPET.format(name=f'function_{index}', number=str(index) * (1 + index % 64), text='x' * (index % 4096))
+        parts.append(part)
+        length += len(part)
+        index += 1
+    return ''.join(parts)[:size].rsplit('\n', 1)[0] + '\n'
+
+def sizes(max_mb: int) -> Iterator[int]:
+    size = 1
+    while size < max_mb:
+        yield size
+        size *= 2
+    yield max_mb
+
+def measure(engine: str, source: str) -> Tuple[int, float]:
+    lexer = lex.ENGINES[engine](source)
+    count = 0
+    start = time.perf_counter()
+    while lexer.next_token() is not None:
+        count += 1
+    return count, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--max-mb', type=int, default=100)
+    parser.add_argument('--engines', nargs='+', default=['regex'], choices=sorted(lex.ENGINES))
+    args = parser.parse_args()
+    print(f'{"engine":>8} {"MB":>6} {"tokens":>10} {"seconds":>9} {"MB/s":>8}')
+    for mb in sizes(args.max_mb):
+        source = generate(mb * 1024 * 1024)
+        for engine in args.engines:
+            count, elapsed = measure(engine, source)
+            print(f'{engine:>8} {mb:>6} {count:>10} {elapsed:>9.3f} {mb / elapsed:>8.2f}')
+
+if __name__ == '__main__':
+    main()
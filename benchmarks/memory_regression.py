@@ -0,0 +1,42 @@
+# Memory regression check: traces the bytes retained per token and per AST
+# node for a fixed reference corpus and exits non-zero when either grows past
+# its threshold. Meant to run in CI next to the other checks.
+#
+#   python -m benchmarks.memory_regression
+
+import sys
+
+import lex
+import parse
+from benchmarks.corpus import CORPORA
+from benchmarks.pipeline import count_nodes, traced
+
+# (bytes per token, bytes per node) per corpus, measured with slotted Token
+# and node classes on CPython 3.11 plus about 10% headroom; token bytes
+# include the literal strings the lexer slices out
+LIMITS = {
+    'elseif_chains': (136.0, 83.0),
+    'functions': (128.0, 78.0),
+    'literal_tables': (172.0, 67.0),
+    'nesting': (123.0, 62.0),
+}
+
+REFERENCE_SCALE = 5
+
+def main() -> int:
+    failed = False
+    for name, generate in sorted(CORPORA.items()):
+        source = generate(REFERENCE_SCALE)
+        tokens, token_bytes, _ = traced(lambda: lex.RegexLexer(source).build_tokens())
+        tree, tree_bytes, _ = traced(lambda: parse.Parser(tokens).build_tree())
+        per_token = token_bytes / len(tokens)
+        per_node = tree_bytes / count_nodes(tree)
+        print(f'{name:>15} {per_token:>7.1f} B/token {per_node:>7.1f} B/node')
+        token_limit, node_limit = LIMITS[name]
+        if per_token > token_limit or per_node > node_limit:
+            print(f'{name}: above the limit of {token_limit} B/token, {node_limit} B/node', file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,29 @@
+# Numeric literal benchmark: lexes and parses a data-file style source made
+# almost entirely of integer and float literals, many of them repeated.
+#
+#   python -m benchmarks.numeric_literals --rows 100000
+
+import argparse
+import time
+
+import lex
+import parse
+
+def generate(rows: int) -> str:
+    return ''.join(f'row({index % 1000}, {index % 97}.5, {index}, 0.25, 1, 2, 3);\n' for index in range(rows))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+    source = generate(args.rows)
+    start = time.perf_counter()
+    tokens = lex.RegexLexer(source).build_tokens()
+    lexed = time.perf_counter() - start
+    start = time.perf_counter()
+    parse.Parser(tokens).build_tree()
+    parsed = time.perf_counter() - start
+    print(f'{len(tokens)} tokens: lex {lexed:.3f}s, parse {parsed:.3f}s')
+
+if __name__ == '__main__':
+    main()
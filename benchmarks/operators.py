@@ -0,0 +1,50 @@
+# Dispatch benchmark: parses and lowers expressions made almost entirely of
+# binary and unary operators, and lowers deeply nested calls for comparison.
+#
+#   python -m benchmarks.operators --statements 20000
+
+import argparse
+import time
+
+import lex
+import parse
+import codegen
+
+OPERATORS = ['+', '-', '*', '/', '%', '<', '>', '<=', '>=', '==', '!=', '&&', '||']
+
+def generate(statements: int) -> str:
+    parts = []
+    for index in range(statements):
+        terms = [f'{"-" if term % 3 == 0 else "!" if term % 3 == 1 else ""}x{term}' for term in range(12)]
+        expression = terms[0]
+        for term in range(1, 12):
+            expression += f' {OPERATORS[(index + term) % len(OPERATORS)]} {terms[term]}'
+        parts.append(f'return f({expression});\n')
+    return ''.join(parts)
+
+def calls(statements: int) -> str:
+    return 'return f(f(), f(f(), f(f(f()))), f(f(f(f(f())))));\n' * statements
+
+def best(run, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--statements', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    tokens = lex.RegexLexer(generate(args.statements)).build_tokens()
+    parsing = best(lambda: parse.Parser(tokens).build_tree(), args.repeat)
+    tree = parse.Parser(tokens).build_tree()
+    generating = best(lambda: codegen.Codegen(tree).build_bytecode(), args.repeat)
+    nested = parse.Parser(lex.RegexLexer(calls(args.statements)).build_tokens()).build_tree()
+    calling = best(lambda: codegen.Codegen(nested).build_bytecode(), args.repeat)
+    print(f'{len(tokens)} tokens: parse {parsing:.3f}s ({len(tokens) / parsing:,.0f} tokens/s), codegen {generating:.3f}s, nested calls codegen {calling:.3f}s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# Packed bytecode benchmark: compiles every synthetic corpus and compares
+# the List[Instruction] code codegen.Codegen emits against
+# bytecode.encode's packed form, for retained bytes, pickled bytes and the
+# time to walk every instruction of each.
+#
+#   python -m benchmarks.packed_bytecode --scale 10
+
+from typing import List
+import argparse
+import pickle
+import sys
+import time
+
+import bytecode
+import compiler
+from benchmarks.corpus import CORPORA
+
+def list_bytes(code: List[bytecode.Instruction]) -> int:
+    # the slot array plus each operand int CPython does not cache; Opcode
+    # members are shared by every list
+    owned = {id(value): sys.getsizeof(value) for value in code if type(value) is int and not -5 <= value <= 256}
+    return sys.getsizeof(code) + sum(owned.values())
+
+def walk_list(code: List[bytecode.Instruction]) -> int:
+    count = 0
+    index = 0
+    operands = bytecode.OPERANDS
+    while index < len(code):
+        index += 2 if code[index] in operands else 1
+        count += 1
+    return count
+
+def walk_packed(packed: bytearray) -> int:
+    count = 0
+    extended = bytecode.Opcode.EXTENDED.value
+    for opcode in packed[::2]:
+        if opcode != extended:
+            count += 1
+    return count
+
+def timed(walk, code) -> float:
+    start = time.perf_counter()
+    walk(code)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print(f'{"corpus":>14} {"list B":>10} {"packed B":>10} {"list pickle":>12} {"packed pickle":>14} {"list walk":>10} {"packed walk":>12}')
+    for name in sorted(CORPORA):
+        _, code = compiler.compile(CORPORA[name](args.scale))
+        start = time.perf_counter()
+        packed = bytecode.encode(code)
+        encoding = time.perf_counter() - start
+        assert bytecode.decode(packed) == code
+        assert walk_list(code) == walk_packed(packed)
+        walks = [min(timed(walk, value) for _ in range(args.repeat)) for walk, value in ((walk_list, code), (walk_packed, packed))]
+        print(f'{name:>14} {list_bytes(code):>10} {sys.getsizeof(packed):>10} {len(pickle.dumps(code, pickle.HIGHEST_PROTOCOL)):>12} '
+              f'{len(pickle.dumps(packed, pickle.HIGHEST_PROTOCOL)):>14} {walks[0] * 1e3:>8.2f}ms {walks[1] * 1e3:>10.2f}ms'
+              f'  (encode {encoding * 1e3:.1f}ms)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# Parallel lexing benchmark: lexes one synthetic source serially and with
+# lex.lex_parallel, checks that both produce the same tokens, offsets and
+# errors, and reports the speedup.
+#
+#   python -m benchmarks.parallel_lexing --mb 64 --workers 8
+
+from typing import Any, Callable, List, Optional, Tuple
+import argparse
+import time
+
+import lex
+from benchmarks.lexer_scaling import generate
+
+def describe(tokens: List[lex.Token]) -> List[Tuple[lex.TokenType, Optional[str], Optional[int]]]:
+    return [(token.type, token.literal, token.offset) for token in tokens]
+
+def error(run: Callable[[], Any]) -> Optional[Tuple[Any, ...]]:
+    try:
+        run()
+    except lex.IllegalLexemeError as e:
+        return e.args
+    return None
+
+def check(source: str, workers: int, slice_size: int):
+    serial = lex.RegexLexer(source).build_tokens()
+    parallel = lex.lex_parallel(source, workers, slice_size)
+    assert describe(serial) == describe(parallel), 'token streams differ'
+    # a multi-line string straddling every cut, then an error in a late slice
+    broken = source + '"\n' * 3 + 'let tail = 1;\n' * 1000 + '#'
+    assert error(lambda: lex.RegexLexer(broken).build_tokens()) == error(lambda: lex.lex_parallel(broken, workers, slice_size)), 'errors differ'
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mb', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    check(generate(1 << 20), 4, 1 << 12)
+    source = generate(args.mb * 1024 * 1024)
+    start = time.perf_counter()
+    count = len(lex.RegexLexer(source).build_tokens())
+    serial = time.perf_counter() - start
+    start = time.perf_counter()
+    lex.lex_parallel(source, args.workers)
+    parallel = time.perf_counter() - start
+    print(f'{count} tokens: serial {serial:.3f}s, parallel {parallel:.3f}s, speedup {serial / parallel:.2f}x')
+
+if __name__ == '__main__':
+    main()
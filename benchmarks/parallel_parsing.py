@@ -0,0 +1,41 @@
+# Parallel parsing benchmark: parses a generated library of fn definitions
+# serially and with arena.parse_parallel, checks that both give the same
+# trees, node offsets and bytecode, and reports the speedup along with the
+# parent's share of the parallel time spent joining worker arenas.
+#
+#   python -m benchmarks.parallel_parsing --functions 10000 --workers 8
+
+import argparse
+import pickle
+import time
+
+import lex
+import parse
+import arena
+import codegen
+from benchmarks.corpus import functions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--functions', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    tokens = lex.RegexLexer(functions(args.functions // 100)).build_tokens()
+    start = time.perf_counter()
+    serial = parse.Parser(tokens).build_tree()
+    serial_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    parallel = arena.parse_parallel(tokens, args.workers)
+    parallel_seconds = time.perf_counter() - start
+    rebuilt = parallel.build_tree()
+    assert repr(serial) == repr(rebuilt)
+    assert [statement.offset for statement in serial] == [statement.offset for statement in rebuilt]
+    assert codegen.Codegen(serial).build_bytecode() == codegen.Codegen(parallel.statements()).build_bytecode()
+    data = pickle.dumps(parallel)
+    start = time.perf_counter()
+    arena.Arena().extend(pickle.loads(data))
+    join_seconds = time.perf_counter() - start
+    print(f'{len(serial)} statements: serial {serial_seconds:.3f}s, parallel {parallel_seconds:.3f}s, speedup {serial_seconds / parallel_seconds:.2f}x, join {join_seconds:.3f}s')
+
+if __name__ == '__main__':
+    main()
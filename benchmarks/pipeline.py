@@ -0,0 +1,101 @@
+# Pipeline throughput benchmark: runs lex.Lexer.build_tokens,
+# parse.Parser.build_tree and codegen.Codegen.build_bytecode separately over
+# every synthetic corpus and reports tokens/sec, nodes/sec and peak traced
+# memory per stage as JSON, for comparing results release over release.
+#
+#   python -m benchmarks.pipeline --scale 10 --output results.json
+
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import lex
+import parse
+import codegen
+import bytecode
+from benchmarks.corpus import CORPORA
+
+def fields(node: parse.Node) -> Iterator[Any]:
+    for cls in type(node).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            yield getattr(node, name)
+
+def count_nodes(root: Any) -> int:
+    count = 0
+    pending = [root]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, parse.Node):
+            count += 1
+            pending.extend(fields(value))
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+        elif isinstance(value, dict):
+            pending.extend(value.keys())
+            pending.extend(value.values())
+    return count
+
+# runs build under tracemalloc and gives its result, the traced bytes still
+# held once it returns and the peak traced bytes while it ran
+def traced(build: Callable[[], Any]) -> Tuple[Any, int, int]:
+    tracemalloc.start()
+    result = build()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, peak
+
+def measure(stage: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    seconds = min(timed(stage) for _ in range(repeat))
+    _, _, peak = traced(stage)
+    return {'seconds': seconds, 'peak_bytes': peak}
+
+def timed(stage: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    stage()
+    return time.perf_counter() - start
+
+def run(name: str, source: str, repeat: int) -> Dict[str, Any]:
+    tokens = lex.Lexer(source).build_tokens()
+    tree = parse.Parser(tokens).build_tree()
+    nodes = count_nodes(tree)
+    result: Dict[str, Any] = {'corpus': name, 'bytes': len(source), 'tokens': len(tokens), 'nodes': nodes}
+    lexing = measure(lambda: lex.Lexer(source).build_tokens(), repeat)
+    lexing['tokens_per_second'] = len(tokens) / lexing['seconds']
+    parsing = measure(lambda: parse.Parser(tokens).build_tree(), repeat)
+    parsing['tokens_per_second'] = len(tokens) / parsing['seconds']
+    parsing['nodes_per_second'] = nodes / parsing['seconds']
+    result['lex'] = lexing
+    result['parse'] = parsing
+    generating = measure(lambda: codegen.Codegen(tree).build_bytecode(), repeat)
+    generating['nodes_per_second'] = nodes / generating['seconds']
+    result['codegen'] = generating
+    return result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--corpora', nargs='+', default=sorted(CORPORA), choices=sorted(CORPORA))
+    parser.add_argument('--output', default=None)
+    args = parser.parse_args()
+    results: List[Dict[str, Any]] = [run(name, CORPORA[name](args.scale), args.repeat) for name in args.corpora]
+    report = {
+        'bytecode_version': bytecode.VERSION,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'scale': args.scale,
+        'results': results,
+    }
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+if __name__ == '__main__':
+    main()
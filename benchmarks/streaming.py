@@ -0,0 +1,26 @@
+# Streaming pipeline benchmark: compares the peak traced memory of lowering
+# a long script from a fully built tree against feeding codegen straight
+# from parse.Parser.statements(). Tokens are built before tracing starts.
+#
+#   python -m benchmarks.streaming --statements 100000
+
+import argparse
+
+import lex
+import parse
+import codegen
+from benchmarks.pipeline import traced
+
+STATEMENT = 'return f(f(), f(f(), f()), f(f(f())));\n'
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--statements', type=int, default=100000)
+    args = parser.parse_args()
+    tokens = lex.RegexLexer(STATEMENT * args.statements).build_tokens()
+    _, _, whole = traced(lambda: codegen.Codegen(parse.Parser(tokens).build_tree()).build_bytecode())
+    _, _, streamed = traced(lambda: codegen.Codegen(parse.Parser(tokens).statements()).build_bytecode())
+    print(f'{args.statements} statements: whole tree {whole / 1e6:.1f} MB peak, streamed {streamed / 1e6:.1f} MB peak')
+
+if __name__ == '__main__':
+    main()
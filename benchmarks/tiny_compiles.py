@@ -0,0 +1,39 @@
+# Tiny compilation benchmark: compiles many one-line programs, once building
+# a fresh lexer, parser and codegen per input and once through a reused
+# compiler.Compiler, and reports the time per compile of each.
+#
+#   python -m benchmarks.tiny_compiles --count 1000000
+
+import argparse
+import time
+
+import lex
+import parse
+import codegen
+import compiler
+
+SOURCES = ['return;', 'return f();', 'return f(f(), f());', '']
+
+def fresh(source: str):
+    return codegen.Codegen(parse.Parser(lex.RegexLexer(source).build_tokens()).build_tree()).build_bytecode()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=1000000)
+    args = parser.parse_args()
+    sources = [SOURCES[index % len(SOURCES)] for index in range(args.count)]
+    reused = compiler.Compiler()
+    assert all(fresh(source) == reused.compile(source) for source in SOURCES)
+    for name, run in (('fresh', fresh), ('reused', reused.compile)):
+        start = time.perf_counter()
+        for source in sources:
+            run(source)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(args.count):
+            run('')
+        empty = time.perf_counter() - start
+        print(f'{name:>8}: {elapsed / args.count * 1e6:.2f}us per compile, {empty / args.count * 1e6:.2f}us fixed overhead (empty input)')
+
+if __name__ == '__main__':
+    main()
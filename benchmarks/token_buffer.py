@@ -0,0 +1,44 @@
+# Token storage benchmark: compares a List[Token] against a lex.TokenBuffer
+# for retained bytes per token and for a full parse over each, the buffer
+# both through parse.Parser and through parse.BufferParser.
+#
+#   python -m benchmarks.token_buffer --tokens 1000000
+
+from typing import Any, Callable
+import argparse
+import time
+
+import lex
+import parse
+from benchmarks.pipeline import traced
+
+SNIPPET = 'let value_{index} = ({index} + offset_{group}) * 2 - "label_{group}";\n'
+
+def generate(count: int) -> str:
+    # each statement is 13 tokens
+    return ''.join(SNIPPET.format(index=index, group=index % 100) for index in range(count // 13 + 1))
+
+def parse_seconds(tokens: Any, parser: Callable[[Any], parse.Parser]=parse.Parser) -> float:
+    start = time.perf_counter()
+    parser(tokens).build_tree()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tokens', type=int, default=1000000)
+    args = parser.parse_args()
+    source = generate(args.tokens)
+    tokens, list_bytes, _ = traced(lambda: lex.RegexLexer(source).build_tokens())
+    count = len(tokens)
+    list_parse = parse_seconds(tokens)
+    del tokens
+    buffer, buffer_bytes, _ = traced(lambda: lex.RegexLexer(source).build_buffer())
+    buffer_parse = parse_seconds(buffer)
+    fast_parse = parse_seconds(buffer, parse.BufferParser)
+    print(f'{"storage":>8} {"tokens":>10} {"bytes/token":>12} {"parse s":>9}')
+    print(f'{"list":>8} {count:>10} {list_bytes / count:>12.1f} {list_parse:>9.3f}')
+    print(f'{"buffer":>8} {len(buffer):>10} {buffer_bytes / count:>12.1f} {buffer_parse:>9.3f}')
+    print(f'{"fast":>8} {len(buffer):>10} {buffer_bytes / count:>12.1f} {fast_parse:>9.3f}')
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,12 @@
-from typing import Union, Tuple, List, Any
+from typing import Union, Tuple, List, Dict, NamedTuple, Any
 from enum import Enum, auto
 
+# operands follow their opcode inline in the code list:
+#   PUSH, LOAD, STORE         index into the data pool
+#   CALL                      argument count; arguments are pushed first, then the callee
+#   JUMP, JUMP_IF_FALSE       absolute index into the code list
+#   EXIT                      exit status
+# JUMP_IF_FALSE pops the condition it tests
 class Opcode(Enum):
     EXIT = auto()
     RETURN = auto()
@@ -10,7 +16,139 @@ class Opcode(Enum):
     LOAD = auto()
     STORE = auto()
     CALL = auto()
+    POP = auto()
+    DUPLICATE = auto()
+    JUMP = auto()
+    JUMP_IF_FALSE = auto()
+    ADD = auto()
+    SUBTRACT = auto()
+    MULTIPLY = auto()
+    DIVIDE = auto()
+    MODULO = auto()
+    LESS = auto()
+    GREATER = auto()
+    LESS_EQUAL = auto()
+    GREATER_EQUAL = auto()
+    EQUAL = auto()
+    NOT_EQUAL = auto()
+    # only in packed code, see encode
+    EXTENDED = auto()
+
+# a fn definition in the data pool: its body starts at entry in the code
+# list and binds arguments, in order, to the values passed by CALL
+class Function(NamedTuple):
+    name: str
+    arguments: Tuple[str, ...]
+    entry: int
 
 Instruction = Union[Opcode, Any]
-Object = Union[str, bool, float, None]
-Bytecode = Tuple[List[Object], List[Instruction]]
\ No newline at end of file
+Object = Union[str, bool, int, float, Function, None]
+Bytecode = Tuple[List[Object], List[Instruction]]
+
+# bumped whenever the shape of emitted bytecode changes, so caches keyed by
+# it drop output from older compilers
+VERSION = 2
+
+OPERANDS = frozenset({Opcode.PUSH, Opcode.LOAD, Opcode.STORE, Opcode.CALL, Opcode.JUMP, Opcode.JUMP_IF_FALSE, Opcode.EXIT})
+JUMPS = frozenset({Opcode.JUMP, Opcode.JUMP_IF_FALSE})
+OPCODES: Dict[int, Opcode] = {opcode.value: opcode for opcode in Opcode}
+
+# packed code is a run of two-byte units, an opcode number and an 8-bit
+# operand (0 when there is none); an operand over 255 is split into bytes,
+# each but the lowest carried by an EXTENDED unit in front, as CPython's
+# EXTENDED_ARG. Jump targets count units rather than list slots
+Packed = Tuple[List[Object], bytearray]
+
+def extensions(operand: int) -> int:
+    count = 0
+    while operand > 0xff:
+        operand >>= 8
+        count += 1
+    return count
+
+# each instruction as (list index, opcode, operand) and the unit each list
+# index starts at in packed code
+def layout(code: List[Instruction]) -> Tuple[List[Tuple[int, Opcode, int]], Dict[int, int]]:
+    instructions: List[Tuple[int, Opcode, int]] = []
+    index = 0
+    while index < len(code):
+        opcode = code[index]
+        if opcode in OPERANDS:
+            instructions.append((index, opcode, code[index + 1]))
+            index += 2
+        else:
+            instructions.append((index, opcode, 0))
+            index += 1
+    # a jump's width depends on where its target lands, which depends on
+    # the widths before it, so widths only grow until they settle
+    widths = [1 + extensions(operand) if opcode not in JUMPS else 1 for _, opcode, operand in instructions]
+    while True:
+        units: Dict[int, int] = {}
+        unit = 0
+        for (index, _, _), width in zip(instructions, widths):
+            units[index] = unit
+            unit += width
+        units[len(code)] = unit
+        settled = True
+        for number, (_, opcode, operand) in enumerate(instructions):
+            if opcode in JUMPS and (width := 1 + extensions(units[operand])) > widths[number]:
+                widths[number] = width
+                settled = False
+        if settled:
+            return instructions, units
+
+def emit(instructions: List[Tuple[int, Opcode, int]], units: Dict[int, int]) -> bytearray:
+    packed = bytearray()
+    for _, opcode, operand in instructions:
+        if opcode in JUMPS:
+            operand = units[operand]
+        for shift in range(extensions(operand) * 8, 0, -8):
+            packed += bytes((Opcode.EXTENDED.value, operand >> shift & 0xff))
+        packed += bytes((opcode.value, operand & 0xff))
+    return packed
+
+def encode(code: List[Instruction]) -> bytearray:
+    return emit(*layout(code))
+
+# the code list and the list index each unit that starts an instruction
+# maps to, plus the end of the code
+def expand(packed: bytes) -> Tuple[List[Instruction], Dict[int, int]]:
+    code: List[Instruction] = []
+    indices: Dict[int, int] = {}
+    jumps: List[int] = []
+    operand = 0
+    start = 0
+    for unit in range(len(packed) // 2):
+        opcode = OPCODES[packed[unit * 2]]
+        operand = operand << 8 | packed[unit * 2 + 1]
+        if opcode is Opcode.EXTENDED:
+            continue
+        indices[start] = len(code)
+        start = unit + 1
+        if opcode in JUMPS:
+            jumps.append(len(code) + 1)
+        code.append(opcode)
+        if opcode in OPERANDS:
+            code.append(operand)
+        operand = 0
+    indices[start] = len(code)
+    for jump in jumps:
+        code[jump] = indices[code[jump]]
+    return code, indices
+
+def decode(packed: bytes) -> List[Instruction]:
+    return expand(packed)[0]
+
+# the whole program packed; Function entries in the pool are moved to
+# count units as well
+def pack(program: Bytecode) -> Packed:
+    data, code = program
+    instructions, units = layout(code)
+    data = [value._replace(entry=units[value.entry]) if isinstance(value, Function) else value for value in data]
+    return data, emit(instructions, units)
+
+def unpack(program: Packed) -> Bytecode:
+    data, packed = program
+    code, indices = expand(packed)
+    data = [value._replace(entry=indices[value.entry]) if isinstance(value, Function) else value for value in data]
+    return data, code
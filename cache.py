@@ -0,0 +1,196 @@
+from typing import Optional, List, Dict, Tuple, cast
+from collections import OrderedDict
+from enum import Enum, auto
+import hashlib
+import os
+import pickle
+
+import lex
+import parse
+import codegen
+import bytecode
+import compiler
+import image
+
+# what is kept for one source: its tokens and tree only when the cache was
+# asked to keep intermediate stages, its bytecode always
+Stages = Tuple[Optional[List[lex.Token]], Optional[List[parse.Statement]], bytecode.Bytecode]
+
+def digest(source: str) -> str:
+    return hashlib.blake2b(source.encode(), digest_size=16).hexdigest()
+
+# compiles sources through an in-memory LRU tier bounded by the pickled size
+# of its entries and an optional on-disk tier; disk entries live under a
+# directory per bytecode.VERSION, so a new compiler never reads stale output,
+# and per stages setting, so a cache keeping stages never reads an entry
+# without them
+class CompileCache:
+    def __init__(self, directory: Optional[str]=None, budget: int=64 << 20, stages: bool=False):
+        self.directory = os.path.join(directory, f'v{bytecode.VERSION}', 'stages' if stages else 'code') if directory is not None else None
+        self.budget = budget
+        self.stages = stages
+        self.memory: OrderedDict[str, Tuple[int, Stages]] = OrderedDict()
+        self.used = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def path(self, key: str) -> str:
+        return os.path.join(cast(str, self.directory), key[:2], f'{key}.pickle')
+
+    def remember(self, key: str, entry: Stages, size: int):
+        if size > self.budget:
+            return
+        self.memory[key] = (size, entry)
+        self.used += size
+        while self.used > self.budget:
+            _, (evicted, _) = self.memory.popitem(last=False)
+            self.used -= evicted
+
+    def load(self, key: str) -> Optional[Stages]:
+        if (cached := self.memory.get(key)) is not None:
+            self.memory.move_to_end(key)
+            self.memory_hits += 1
+            return cached[1]
+        if self.directory is None:
+            return None
+        try:
+            with open(self.path(key), 'rb') as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+        # a damaged entry, or one pickled from classes that have since
+        # changed, is dropped and compiled again; unpickling garbage can
+        # raise nearly any exception, AttributeError and ImportError among
+        # them, so all are caught
+        try:
+            entry = cast(Stages, pickle.loads(data))
+        except Exception:
+            try:
+                os.unlink(self.path(key))
+            except FileNotFoundError:
+                pass
+            return None
+        self.disk_hits += 1
+        self.remember(key, entry, len(data))
+        return entry
+
+    def store(self, key: str, entry: Stages):
+        data = pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)
+        self.remember(key, entry, len(data))
+        if self.directory is None:
+            return
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        image.write_file(path, data)
+
+    def fetch(self, source: str) -> Stages:
+        key = digest(source)
+        if (entry := self.load(key)) is not None:
+            return entry
+        self.misses += 1
+        tokens = lex.RegexLexer(source).build_tokens()
+        tree = parse.Parser(tokens).build_tree()
+        code = codegen.Codegen(tree).build_bytecode()
+        entry = (tokens, tree, code) if self.stages else (None, None, code)
+        self.store(key, entry)
+        return entry
+
+    # the lists are copied, so a caller changing them leaves the cached
+    # entry as it was
+    def lookup(self, source: str) -> Stages:
+        tokens, tree, (data, code) = self.fetch(source)
+        return (
+            list(tokens) if tokens is not None else None,
+            list(tree) if tree is not None else None,
+            (list(data), list(code)),
+        )
+
+    def compile(self, source: str) -> bytecode.Bytecode:
+        return self.lookup(source)[2]
+
+    def statistics(self) -> Dict[str, int]:
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'entries': len(self.memory),
+            'bytes': self.used,
+        }
+
+# how ImageCache decides a cached image is still good, as in PEP 552
+class Invalidation(Enum):
+    # the source's mtime and size match the ones stamped on the image
+    TIMESTAMP = auto()
+    # the source's digest matches; reads every source, but survives
+    # checkouts and builds that touch mtimes
+    CHECKED_HASH = auto()
+    # any image with a digest is trusted without reading the source
+    UNCHECKED_HASH = auto()
+
+# compiles source files to images kept in a DIRECTORY next to each source,
+# named after the source file and tagged with bytecode.VERSION, so
+# compilers of different versions keep separate images
+class ImageCache:
+    DIRECTORY = '__tccache__'
+
+    def __init__(self, invalidation: Invalidation=Invalidation.TIMESTAMP):
+        self.invalidation = invalidation
+        self.compiler = compiler.Compiler()
+        self.hits = 0
+        self.misses = 0
+
+    # the whole file name is kept, so prog.tc and prog.txt get their own
+    # images
+    def path(self, source: str) -> str:
+        directory, name = os.path.split(source)
+        return os.path.join(directory, self.DIRECTORY, f'{name}.v{bytecode.VERSION}.tcb')
+
+    def fresh(self, stamp: image.Stamp, source: str, status: os.stat_result) -> bool:
+        match self.invalidation:
+            case Invalidation.TIMESTAMP:
+                return stamp.digest is None and (stamp.mtime, stamp.size) == (status.st_mtime_ns, status.st_size)
+            case Invalidation.CHECKED_HASH:
+                if stamp.digest is None:
+                    return False
+                with open(source, 'rb') as file:
+                    return hashlib.blake2b(file.read(), digest_size=16).digest() == stamp.digest
+            case Invalidation.UNCHECKED_HASH:
+                return stamp.digest is not None
+
+    # the image for the source file at source, compiled first if there is
+    # none or it is stale; the caller closes it
+    def load(self, source: str) -> image.Image:
+        path = self.path(source)
+        # taken before reading, so an edit made while compiling leaves an
+        # image stamped as older than the source
+        status = os.stat(source)
+        try:
+            cached = image.Image(path)
+        except (FileNotFoundError, image.ImageError):
+            pass
+        else:
+            if self.fresh(cached.stamp, source, status):
+                self.hits += 1
+                return cached
+            cached.close()
+        self.misses += 1
+        with open(source, 'rb') as file:
+            data = file.read()
+        if self.invalidation == Invalidation.TIMESTAMP:
+            stamp = image.Stamp(status.st_mtime_ns, status.st_size)
+        else:
+            stamp = image.Stamp(digest=hashlib.blake2b(data, digest_size=16).digest())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        image.write(path, self.compiler.compile(data.decode()), stamp=stamp)
+        return image.Image(path)
+
+    def compile(self, source: str) -> bytecode.Bytecode:
+        with self.load(source) as loaded:
+            return loaded.program()
+
+    def statistics(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+        }
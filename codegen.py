@@ -1,38 +1,167 @@
-from typing import List, cast
+from typing import List, Dict, Tuple, Callable, Iterable, Any, cast
 import parse
 import bytecode
+import arena
+
+UNARY_OPCODES: Dict[parse.Unary.Operation, bytecode.Opcode] = {
+    parse.Unary.Operation.NOT: bytecode.Opcode.NOT,
+    parse.Unary.Operation.NEGATE: bytecode.Opcode.NEGATE,
+}
+
+# AND and OR short-circuit through jumps instead
+BINARY_OPCODES: Dict[parse.Binary.Operation, bytecode.Opcode] = {
+    parse.Binary.Operation.ADD: bytecode.Opcode.ADD,
+    parse.Binary.Operation.SUBTRACT: bytecode.Opcode.SUBTRACT,
+    parse.Binary.Operation.MULTIPLY: bytecode.Opcode.MULTIPLY,
+    parse.Binary.Operation.DIVIDE: bytecode.Opcode.DIVIDE,
+    parse.Binary.Operation.MODULO: bytecode.Opcode.MODULO,
+    parse.Binary.Operation.LESS: bytecode.Opcode.LESS,
+    parse.Binary.Operation.GREATER: bytecode.Opcode.GREATER,
+    parse.Binary.Operation.LESS_EQUAL: bytecode.Opcode.LESS_EQUAL,
+    parse.Binary.Operation.GREATER_EQUAL: bytecode.Opcode.GREATER_EQUAL,
+    parse.Binary.Operation.EQUAL: bytecode.Opcode.EQUAL,
+    parse.Binary.Operation.NOT_EQUAL: bytecode.Opcode.NOT_EQUAL,
+}
 
 class Codegen:
-    def __init__(self, tree: List[parse.Statement]):
+    # tree may be any iterable, such as parse.Parser.statements(); each
+    # statement is lowered as soon as it arrives and is not kept afterwards
+    def __init__(self, tree: Iterable[parse.Statement]):
+        self.reset(tree)
+
+    # the lists are replaced rather than cleared, since the previous
+    # build_bytecode result still refers to them
+    def reset(self, tree: Iterable[parse.Statement]):
         self.tree = tree
         self.code = cast(List[bytecode.Instruction], [])
         self.data = cast(List[bytecode.Object], [])
-    
+        self.constants: Dict[Tuple[type, bytecode.Object], int] = {}
+
+    # index of value in the data pool, added on first use. Keyed by type as
+    # well, since 1, 1.0 and True compare and hash equal
+    def constant(self, value: bytecode.Object) -> int:
+        key = (type(value), value)
+        if (index := self.constants.get(key)) is None:
+            index = self.constants[key] = len(self.data)
+            self.data.append(value)
+        return index
+
+    # emits a jump with no target yet and returns where to patch it
+    def jump(self, opcode: bytecode.Opcode) -> int:
+        self.code.extend([opcode, None])
+        return len(self.code) - 1
+
+    def land(self, jump: int):
+        self.code[jump] = len(self.code)
+
+    def transform_identifier(self, branch: parse.Identifier):
+        self.code.extend([bytecode.Opcode.LOAD, self.constant(branch.value)])
+
+    def transform_leaf(self, branch: parse.Leaf):
+        self.code.extend([bytecode.Opcode.PUSH, self.constant(branch.value)])
+
+    def transform_unary(self, branch: parse.Unary):
+        self.transform_expression(branch.value)
+        self.code.append(UNARY_OPCODES[branch.operation])
+
+    def transform_binary(self, branch: parse.Binary):
+        self.transform_expression(branch.left)
+        if (opcode := BINARY_OPCODES.get(branch.operation)) is not None:
+            self.transform_expression(branch.right)
+            self.code.append(opcode)
+            return
+        # left is the result if it settles the operation, right otherwise
+        self.code.append(bytecode.Opcode.DUPLICATE)
+        if branch.operation == parse.Binary.Operation.OR:
+            self.code.append(bytecode.Opcode.NOT)
+        settled = self.jump(bytecode.Opcode.JUMP_IF_FALSE)
+        self.code.append(bytecode.Opcode.POP)
+        self.transform_expression(branch.right)
+        self.land(settled)
+
+    def transform_body(self, block: parse.Block):
+        for statement in block.body:
+            self.transform_statement(statement)
+
+    # a block used as a value runs its statements and evaluates to None
+    def transform_block(self, branch: parse.Block):
+        self.transform_body(branch)
+        self.code.extend([bytecode.Opcode.PUSH, self.constant(None)])
+
     def trasform_function_call(self, branch: parse.FunctionCall):
         for argument in branch.arguments:
             self.transform_expression(argument)
-        # TODO
+        self.transform_expression(branch.callee)
+        self.code.extend([bytecode.Opcode.CALL, len(branch.arguments)])
         
     def transform_expression(self, branch: parse.Expression):
-        match type(branch):
-            case parse.FunctionCall:
-                self.trasform_function_call(cast(parse.FunctionCall, branch))
-            case _:
+        if (handler := self.expression_handlers.get(type(branch))) is None:
+            # an arena.NodeView is looked up by the class it stands for
+            if not isinstance(branch, arena.NodeView) or (handler := self.expression_handlers.get(branch.node_class)) is None:
                 raise ValueError("UNREACHABLE @ codegen/transform_expression")
+        handler(self, branch)
     
     def transform_return(self, branch: parse.Return):
         if branch.value is not None:
             self.transform_expression(branch.value)
         else:
-            self.code.extend([bytecode.Opcode.PUSH, None])
+            self.code.extend([bytecode.Opcode.PUSH, self.constant(None)])
         self.code.append(bytecode.Opcode.RETURN)
+
+    def transform_let(self, branch: parse.Let):
+        self.transform_expression(branch.value)
+        self.code.extend([bytecode.Opcode.STORE, self.constant(branch.identifier)])
+
+    def transform_wrapper(self, branch: parse.Wrapper):
+        self.transform_expression(branch.value)
+        self.code.append(bytecode.Opcode.POP)
+
+    def transform_if(self, branch: parse.If):
+        exits = []
+        for condition, consequence in [branch.main, *branch.alternatives.items()]:
+            self.transform_expression(condition)
+            skip = self.jump(bytecode.Opcode.JUMP_IF_FALSE)
+            self.transform_body(consequence)
+            exits.append(self.jump(bytecode.Opcode.JUMP))
+            self.land(skip)
+        if branch.fallback is not None:
+            self.transform_body(branch.fallback)
+        for exit in exits:
+            self.land(exit)
+
+    # the body is emitted inline and jumped over; falling off its end
+    # returns None
+    def transform_fn_def(self, branch: parse.FunctionDef):
+        over = self.jump(bytecode.Opcode.JUMP)
+        function = bytecode.Function(branch.name, tuple(branch.arguments), len(self.code))
+        self.transform_body(branch.body)
+        self.code.extend([bytecode.Opcode.PUSH, self.constant(None), bytecode.Opcode.RETURN])
+        self.land(over)
+        self.code.extend([bytecode.Opcode.PUSH, self.constant(function), bytecode.Opcode.STORE, self.constant(branch.name)])
     
     def transform_statement(self, branch: parse.Statement):
-        match type(branch):
-            case parse.Return:
-                return self.transform_return(cast(parse.Return, branch))
-            case _:
+        if (handler := self.statement_handlers.get(type(branch))) is None:
+            if not isinstance(branch, arena.NodeView) or (handler := self.statement_handlers.get(branch.node_class)) is None:
                 raise ValueError('UNREACHABLE @ codegen/transform_statement')
+        handler(self, branch)
+
+    # node class -> handler, built once with the class rather than scanned
+    # case by case for every node
+    expression_handlers: Dict[type, Callable[['Codegen', Any], None]] = {
+        parse.Identifier: transform_identifier,
+        parse.Leaf: transform_leaf,
+        parse.Unary: transform_unary,
+        parse.Binary: transform_binary,
+        parse.Block: transform_block,
+        parse.FunctionCall: trasform_function_call,
+    }
+    statement_handlers: Dict[type, Callable[['Codegen', Any], None]] = {
+        parse.Return: transform_return,
+        parse.Let: transform_let,
+        parse.Wrapper: transform_wrapper,
+        parse.If: transform_if,
+        parse.FunctionDef: transform_fn_def,
+    }
     
     def build_bytecode(self) -> bytecode.Bytecode:
         for statement in self.tree:
@@ -0,0 +1,47 @@
+from typing import List
+import threading
+
+import lex
+import parse
+import codegen
+import bytecode
+import image
+
+# one lexer, parser and codegen reset and reused for every source, for
+# callers that compile many small programs; the dispatch tables they use
+# are built once per process at import
+class Compiler:
+    def __init__(self):
+        self.lexer = lex.RegexLexer('')
+        self.parser = parse.Parser([])
+        self.codegen = codegen.Codegen([])
+
+    def tokens(self, source: str) -> List[lex.Token]:
+        self.lexer.reset(source)
+        return self.lexer.build_tokens()
+
+    def tree(self, source: str) -> List[parse.Statement]:
+        self.parser.reset(self.tokens(source))
+        return self.parser.build_tree()
+
+    # statements go from the parser to codegen one at a time, so no full
+    # tree is ever built
+    def compile(self, source: str) -> bytecode.Bytecode:
+        self.parser.reset(self.tokens(source))
+        self.codegen.reset(self.parser.statements())
+        return self.codegen.build_bytecode()
+
+# compilers are not thread-safe, so each thread gets its own
+pool = threading.local()
+
+def compile(source: str) -> bytecode.Bytecode:
+    if (compiler := getattr(pool, 'compiler', None)) is None:
+        compiler = pool.compiler = Compiler()
+    return compiler.compile(source)
+
+# compiles the source file at path into a program image at output, keeping
+# the source in its debug section if asked
+def compile_file(path: str, output: str, debug: bool=False):
+    with open(path, encoding='utf-8') as file:
+        source = file.read()
+    image.write(output, compile(source), source.encode() if debug else None)
@@ -0,0 +1,189 @@
+from typing import Optional, Sequence, List, Dict, NamedTuple, Union, cast, overload
+import mmap
+import os
+import struct
+import tempfile
+
+import bytecode
+
+# a compiled program on disk, all integers little-endian:
+#   header    magic, FORMAT, bytecode.VERSION, flags, (offset, size) of
+#             the pool, code and debug sections, then the source Stamp
+#   pool      entry count, count + 1 offsets relative to the section, then
+#             the entries, each a tag byte and its payload
+#   code      bytecode.pack output, Function entries counting units
+#   debug     free-form bytes for tools, such as the source; only present
+#             with the DEBUG flag and never read by the loader
+MAGIC = b'TCBC'
+FORMAT = 2
+HEADER = struct.Struct('<4sHHI6IQQ16s')
+DEBUG = 1
+HASHED = 2
+
+# read once at import, since os.umask can only be read by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+# what the image was compiled from, for deciding whether it is stale: the
+# source's mtime in nanoseconds and size, or with HASHED its content digest
+# (see PEP 552). The zero stamp is for images with no source file
+class Stamp(NamedTuple):
+    mtime: int = 0
+    size: int = 0
+    digest: Optional[bytes] = None
+
+NONE, FALSE, TRUE, INT, FLOAT, STRING, FUNCTION = range(7)
+FUNCTION_HEADER = struct.Struct('<IH')
+LENGTH = struct.Struct('<H')
+OFFSET = struct.Struct('<I')
+DOUBLE = struct.Struct('<d')
+
+class ImageError(Exception):
+    pass
+
+def encode_name(name: str) -> bytes:
+    encoded = name.encode()
+    return LENGTH.pack(len(encoded)) + encoded
+
+def encode_object(value: bytecode.Object) -> bytes:
+    if value is None:
+        return bytes((NONE,))
+    # bool before int, since it is one
+    if isinstance(value, bool):
+        return bytes((TRUE if value else FALSE,))
+    if isinstance(value, int):
+        return bytes((INT,)) + value.to_bytes((value.bit_length() + 8) // 8, 'little', signed=True)
+    if isinstance(value, float):
+        return bytes((FLOAT,)) + DOUBLE.pack(value)
+    if isinstance(value, str):
+        return bytes((STRING,)) + value.encode()
+    return bytes((FUNCTION,)) + FUNCTION_HEADER.pack(value.entry, len(value.arguments)) + b''.join(encode_name(name) for name in (value.name, *value.arguments))
+
+def decode_object(buffer: memoryview, start: int, end: int) -> bytecode.Object:
+    tag = buffer[start]
+    if tag == NONE:
+        return None
+    if tag == FALSE or tag == TRUE:
+        return tag == TRUE
+    if tag == INT:
+        return int.from_bytes(buffer[start + 1:end], 'little', signed=True)
+    if tag == FLOAT:
+        return cast(float, DOUBLE.unpack_from(buffer, start + 1)[0])
+    if tag == STRING:
+        return str(buffer[start + 1:end], 'utf-8')
+    if tag != FUNCTION:
+        raise ImageError('unknown constant tag', tag)
+    entry, count = FUNCTION_HEADER.unpack_from(buffer, start + 1)
+    index = start + 1 + FUNCTION_HEADER.size
+    names: List[str] = []
+    for _ in range(count + 1):
+        length, = LENGTH.unpack_from(buffer, index)
+        index += LENGTH.size
+        names.append(str(buffer[index:index + length], 'utf-8'))
+        index += length
+    return bytecode.Function(names[0], tuple(names[1:]), entry)
+
+def encode_pool(data: List[bytecode.Object]) -> bytes:
+    entries = [encode_object(value) for value in data]
+    offsets = [OFFSET.size * (len(entries) + 2)]
+    for entry in entries:
+        offsets.append(offsets[-1] + len(entry))
+    return OFFSET.pack(len(entries)) + b''.join(OFFSET.pack(offset) for offset in offsets) + b''.join(entries)
+
+def dumps(program: bytecode.Bytecode, debug: Optional[bytes]=None, stamp: Stamp=Stamp()) -> bytes:
+    data, code = bytecode.pack(program)
+    pool = encode_pool(data)
+    debug_bytes = debug if debug is not None else b''
+    flags = (DEBUG if debug is not None else 0) | (HASHED if stamp.digest is not None else 0)
+    start = HEADER.size
+    return HEADER.pack(
+        MAGIC, FORMAT, bytecode.VERSION, flags,
+        start, len(pool),
+        start + len(pool), len(code),
+        start + len(pool) + len(code), len(debug_bytes),
+        stamp.mtime, stamp.size, stamp.digest or bytes(16),
+    ) + pool + code + debug_bytes
+
+# writes data to a temporary file first and renames it over path, so
+# concurrent readers see either the old file or the new one; the file gets
+# the mode open() would have given it rather than mkstemp's 0600
+def write_file(path: str, data: bytes):
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(data)
+        os.chmod(temporary, 0o666 & ~UMASK)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+def write(path: str, program: bytecode.Bytecode, debug: Optional[bytes]=None, stamp: Stamp=Stamp()):
+    write_file(path, dumps(program, debug, stamp))
+
+# the constant pool of a mapped image; each entry is decoded from the
+# mapping on first access and kept
+class Pool(Sequence[bytecode.Object]):
+    def __init__(self, section: memoryview):
+        self.section = section
+        self.count, = OFFSET.unpack_from(section, 0)
+        self.decoded: Dict[int, bytecode.Object] = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    @overload
+    def __getitem__(self, index: int) -> bytecode.Object: ...
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[bytecode.Object]: ...
+    def __getitem__(self, index: Union[int, slice]) -> Union[bytecode.Object, Sequence[bytecode.Object]]:
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        if index not in self.decoded:
+            start, end = struct.unpack_from('<2I', self.section, OFFSET.size * (index + 1))
+            self.decoded[index] = decode_object(self.section, start, end)
+        return self.decoded[index]
+
+# a program image mapped read-only: code is a memoryview over the packed
+# instructions in the mapping, so opening costs the same at any size
+class Image:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size < HEADER.size:
+                raise ImageError('truncated header', path)
+            self.mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, format, version, flags, pool_start, pool_size, code_start, code_size, debug_start, debug_size, mtime, size, digest = HEADER.unpack_from(self.mapping, 0)
+        if magic != MAGIC or format != FORMAT or version != bytecode.VERSION:
+            self.mapping.close()
+            raise ImageError('unsupported image', path, format, version)
+        if max(pool_start + pool_size, code_start + code_size, debug_start + debug_size) > len(self.mapping):
+            self.mapping.close()
+            raise ImageError('truncated image', path)
+        self.stamp = Stamp(mtime, size, digest if flags & HASHED else None)
+        view = memoryview(self.mapping)
+        self.data = Pool(view[pool_start:pool_start + pool_size])
+        self.code = view[code_start:code_start + code_size]
+        self.debug = view[debug_start:debug_start + debug_size] if flags & DEBUG else None
+
+    # the program as codegen emitted it, copied out of the mapping
+    def program(self) -> bytecode.Bytecode:
+        return bytecode.unpack((list(self.data), bytearray(self.code)))
+
+    # views into the mapping must be released before it can be closed
+    def close(self):
+        self.data.section.release()
+        self.code.release()
+        if self.debug is not None:
+            self.debug.release()
+        self.mapping.close()
+
+    def __enter__(self) -> 'Image':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
@@ -1,5 +1,12 @@
 from enum import Enum, auto
-from typing import Optional, List
+from typing import Optional, List, Dict, Callable, Union, Iterable, Iterator, Sequence, Tuple, TextIO, cast
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from concurrent.futures import ProcessPoolExecutor
+import re
+import os
+import mmap
 
 class TokenType(Enum):
     IDENTIFIER = auto()
@@ -34,10 +41,17 @@ class TokenType(Enum):
     KEYWORD_ELSE = auto()
     KEYWORD_RETURN = auto()
 
+Number = Union[int, float]
+
+# value holds the decoded number of NUMBER tokens and is None otherwise
 class Token:
-    def __init__(self, type: TokenType, literal: Optional[str]=None):
+    __slots__ = ('type', 'literal', 'offset', 'value')
+
+    def __init__(self, type: TokenType, literal: Optional[str]=None, offset: Optional[int]=None, value: Optional[Number]=None):
         self.type = type
         self.literal = literal
+        self.offset = offset
+        self.value = value
 
     def __repr__(self) -> str:
         if self.literal is not None:
@@ -45,14 +59,96 @@ class Token:
         else:
             return str(self.type)
 
+# args are the offending lexeme and, when known, its offset in the source
 class IllegalLexemeError(Exception):
     pass
 
+# the one place number literals are converted: literals of decimal digits,
+# in any script, become ints, anything else, or one too long for int(),
+# must parse as a float. A lexer passes its own numbers so repeated constants in one source
+# are converted once and share one value object
+def number_value(number: str, numbers: Optional[Dict[str, Number]]=None) -> Number:
+    if numbers is not None and (value := numbers.get(number)) is not None:
+        return value
+    try:
+        value = int(number) if number.isdecimal() else float(number)
+    except ValueError:
+        try:
+            value = float(number)
+        except ValueError:
+            raise IllegalLexemeError(number)
+    if numbers is not None:
+        numbers[number] = value
+    return value
+
+# offsets of every line start, found with one bulk split the first time a
+# location is asked for, so lexing and parsing only ever carry raw offsets
+class LineIndex:
+    def __init__(self, source: str):
+        self.input = source
+        self.starts = cast(List[int], None)
+
+    def location(self, offset: int) -> Tuple[int, int]:
+        if self.starts is None:
+            self.starts = [0, *accumulate(len(line) + 1 for line in self.input.split('\n'))]
+        line = bisect_right(self.starts, offset)
+        return line, offset - self.starts[line - 1] + 1
+
+KEYWORDS = {
+    'if': TokenType.KEYWORD_IF,
+    'elseif': TokenType.KEYWORD_ELSEIF,
+    'else': TokenType.KEYWORD_ELSE,
+    'return': TokenType.KEYWORD_RETURN,
+    'fn': TokenType.KEYWORD_FN,
+    'let': TokenType.KEYWORD_LET,
+}
+
+OPERATORS = {
+    '(': TokenType.LEFT_PARENTHESIS,
+    ')': TokenType.RIGHT_PARENTHESIS,
+    '{': TokenType.LEFT_CURLY,
+    '}': TokenType.RIGHT_CURLY,
+    '+': TokenType.PLUS,
+    '-': TokenType.DASH,
+    '*': TokenType.ASTERISK,
+    '/': TokenType.SLASH,
+    '%': TokenType.MODULUS,
+    ',': TokenType.COMMA,
+    ';': TokenType.SEMICOLON,
+    '=': TokenType.ASSIGN,
+    '==': TokenType.EQUAL,
+    '!': TokenType.BANG,
+    '!=': TokenType.BANG_EQUAL,
+    '<': TokenType.LESS,
+    '<=': TokenType.LESS_EQUAL,
+    '>': TokenType.GREATER,
+    '>=': TokenType.GREATER_EQUAL,
+    '&&': TokenType.AND,
+    '||': TokenType.OR,
+}
+
+# one alternative per lexeme class, tried in order at each position; the
+# longest operators come first so '==' wins over '='. NAME and NUMBER are
+# wider or narrower than Lexer's str.isalpha/str.isdigit rules for a few
+# Unicode numerals such as '½' and '²'; lexeme_token rejects those as
+# Lexer does
+LEXEME_PATTERN = re.compile(r'''
+    (?P<SPACE>\s+)
+  | (?P<NAME>[^\W\d_]\w*)
+  | (?P<OPERATOR>==|!=|<=|>=|&&|\|\||[(){}+\-*/%,;=!<>])
+  | (?P<NUMBER>[\d.]+)
+  | (?P<STRING>"[^"]*")
+  | (?P<UNTERMINATED>"[^"]*)
+  | (?P<ILLEGAL>.)
+''', re.VERBOSE | re.DOTALL)
+
 class Lexer:
     def __init__(self, source: str):
         self.input = source
         self.index = -1
+        self.start = 0
         self.curr = '\0'
+        self.numbers: Dict[str, Number] = {}
 
     def advance(self) -> bool:
         if self.index + 1 < len(self.input):
@@ -75,16 +171,15 @@ class Lexer:
             self.advance()
         return ident
 
-    def read_number(self) -> str:
+    def read_number(self) -> Token:
         number = self.curr
         while (peek := self.peek()) is not None and (peek.isdigit() or peek == '.'):
             number += peek
             self.advance()
         try:
-            float(number)
-        except ValueError:
-            raise IllegalLexemeError(number)
-        return number
+            return Token(TokenType.NUMBER, number, None, number_value(number, self.numbers))
+        except IllegalLexemeError:
+            raise IllegalLexemeError(number, self.start)
     
     def read_string(self) -> str:
         string = ''
@@ -95,7 +190,7 @@ class Lexer:
                 break
             string += self.curr
         if self.curr != '"' or malformed:
-            raise IllegalLexemeError(f'"{string}')
+            raise IllegalLexemeError(f'"{string}', self.start)
         return string
 
     def next_token(self) -> Optional[Token]:
@@ -104,6 +199,12 @@ class Lexer:
         while self.curr.isspace():
             if not self.advance():
                 return None
+        self.start = self.index
+        token = self.read_token()
+        token.offset = self.start
+        return token
+
+    def read_token(self) -> Token:
         match self.curr:
             case '(':
                 return Token(TokenType.LEFT_PARENTHESIS)
@@ -175,13 +276,460 @@ class Lexer:
                     case _:
                         return Token(TokenType.IDENTIFIER, ident)
             case number if number.isdigit() or number == '.':
-                return Token(TokenType.NUMBER, self.read_number())
+                return self.read_number()
             case illegal:
-                raise IllegalLexemeError(illegal)
+                raise IllegalLexemeError(illegal, self.start)
 
     
     def build_tokens(self) -> List[Token]:
         tokens = []
         while (token := self.next_token()) is not None:
             tokens.append(token)
-        return tokens
\ No newline at end of file
+        return tokens
+
+# end of the run of str.isdigit characters and dots from start, the span
+# Lexer.read_number takes
+def digit_run(text: str, start: int) -> int:
+    end = start
+    while end < len(text) and (text[end].isdigit() or text[end] == '.'):
+        end += 1
+    return end
+
+def lexeme_token(lexeme: re.Match, base: int=0, numbers: Optional[Dict[str, Number]]=None) -> Optional[Token]:
+    offset = base + lexeme.start()
+    match lexeme.lastgroup:
+        case 'SPACE':
+            return None
+        case 'NAME':
+            name = lexeme.group()
+            if not name[0].isalpha():
+                # a Unicode digit or numeral outside \d; Lexer sends the
+                # first to read_number, which rejects it, and rejects the
+                # second outright
+                raise IllegalLexemeError(lexeme.string[lexeme.start():digit_run(lexeme.string, lexeme.start())] if name[0].isdigit() else name[0], offset)
+            if name == 'true' or name == 'false':
+                return Token(TokenType.BOOL, name, offset)
+            if (keyword := KEYWORDS.get(name)) is not None:
+                return Token(keyword, None, offset)
+            return Token(TokenType.IDENTIFIER, name, offset)
+        case 'OPERATOR':
+            return Token(OPERATORS[lexeme.group()], None, offset)
+        case 'NUMBER':
+            number = lexeme.group()
+            end = lexeme.end()
+            if end < len(lexeme.string) and lexeme.string[end].isdigit():
+                # Lexer reads every str.isdigit character into the literal,
+                # so one outside \d makes the whole run illegal
+                raise IllegalLexemeError(lexeme.string[lexeme.start():digit_run(lexeme.string, end)], offset)
+            try:
+                return Token(TokenType.NUMBER, number, offset, number_value(number, numbers))
+            except IllegalLexemeError:
+                raise IllegalLexemeError(number, offset)
+        case 'STRING':
+            return Token(TokenType.STRING, lexeme.string[lexeme.start() + 1:lexeme.end() - 1], offset)
+        case _:
+            if lexeme.group().isdigit():
+                raise IllegalLexemeError(lexeme.string[lexeme.start():digit_run(lexeme.string, lexeme.start())], offset)
+            raise IllegalLexemeError(lexeme.group(), offset)
+
+TOKEN_TYPES: Dict[int, TokenType] = {type.value: type for type in TokenType}
+
+# struct-of-arrays token storage: one small int kind, the whole lexeme's offsets
+# and an index into an interned literal table per token. Indexing builds a
+# Token for that position, offset included, so the parser can read it like a
+# List[Token] while only the columns are kept; number values are decoded once
+# per distinct literal
+class TokenBuffer(Sequence[Token]):
+    def __init__(self):
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.literals = array('I')
+        self.table: List[Optional[str]] = [None]
+        self.interned: Dict[str, int] = {}
+        self.values: Dict[int, Number] = {}
+
+    def append(self, type: TokenType, start: int, end: int, literal: Optional[str]=None):
+        self.kinds.append(type.value)
+        self.starts.append(start)
+        self.ends.append(end)
+        if literal is None:
+            self.literals.append(0)
+        elif (index := self.interned.get(literal)) is not None:
+            self.literals.append(index)
+        else:
+            index = self.interned[literal] = len(self.table)
+            self.table.append(literal)
+            self.literals.append(index)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def value(self, literal: int) -> Number:
+        if (value := self.values.get(literal)) is None:
+            value = self.values[literal] = number_value(cast(str, self.table[literal]))
+        return value
+
+    def __getitem__(self, index: int) -> Token: # type: ignore[override]
+        type, literal = TOKEN_TYPES[self.kinds[index]], self.literals[index]
+        value = self.value(literal) if type == TokenType.NUMBER else None
+        return Token(type, self.table[literal], self.starts[index], value)
+
+# same output as Lexer, but takes each lexeme whole with one match of
+# LEXEME_PATTERN and a slice, so it stays linear on long lexemes
+class RegexLexer:
+    def __init__(self, source: str):
+        self.reset(source)
+
+    def reset(self, source: str):
+        self.input = source
+        self.index = 0
+        self.numbers: Dict[str, Number] = {}
+
+    def next_token(self) -> Optional[Token]:
+        while (lexeme := LEXEME_PATTERN.match(self.input, self.index)) is not None:
+            self.index = lexeme.end()
+            if (token := lexeme_token(lexeme, 0, self.numbers)) is not None:
+                return token
+        return None
+
+    def build_tokens(self) -> List[Token]:
+        tokens = []
+        while (token := self.next_token()) is not None:
+            tokens.append(token)
+        return tokens
+
+    def build_buffer(self) -> TokenBuffer:
+        tokens = TokenBuffer()
+        while (lexeme := LEXEME_PATTERN.match(self.input, self.index)) is not None:
+            self.index = lexeme.end()
+            if (token := lexeme_token(lexeme)) is not None:
+                start, end = lexeme.span()
+                tokens.append(token.type, start, end, token.literal)
+        return tokens
+
+# lexes a text file object or an iterator of str chunks; only the unconsumed
+# tail of the buffer is kept, so memory is bounded by chunk size plus twice
+# the longest lexeme rather than by the source size
+class StreamLexer:
+    def __init__(self, source: Union[str, TextIO, Iterable[str]], chunk_size: int=1 << 16):
+        if isinstance(source, str):
+            source = [source]
+        elif hasattr(source, 'read'):
+            file = cast(TextIO, source)
+            source = iter(lambda: file.read(chunk_size), '')
+        self.chunks = iter(source)
+        self.input = ''
+        self.index = 0
+        self.base = 0
+        self.exhausted = False
+
+    # reads chunks until at least as much new input as the pending tail has
+    # arrived and joins them once, so a lexeme spanning many chunks is
+    # re-matched over a buffer that doubles each time rather than one that
+    # grows by a chunk
+    def refill(self) -> bool:
+        tail = self.input[self.index:]
+        parts = [tail]
+        added = 0
+        for chunk in self.chunks:
+            parts.append(chunk)
+            added += len(chunk)
+            if added > 0 and added >= len(tail):
+                break
+        else:
+            self.exhausted = True
+        if added == 0:
+            return False
+        self.input = ''.join(parts)
+        self.base += self.index
+        self.index = 0
+        return True
+
+    def next_token(self) -> Optional[Token]:
+        while True:
+            lexeme = LEXEME_PATTERN.match(self.input, self.index)
+            # a lexeme touching the end of the buffer may continue in the
+            # next chunk ('=' before '=', digits, an open string), so it is
+            # only taken once no more input can follow it
+            if lexeme is None or lexeme.end() == len(self.input):
+                if not self.exhausted and self.refill():
+                    continue
+                if lexeme is None:
+                    return None
+            self.index = lexeme.end()
+            if (token := lexeme_token(lexeme, self.base)) is not None:
+                return token
+
+    def __iter__(self) -> Iterator[Token]:
+        while (token := self.next_token()) is not None:
+            yield token
+
+    def build_tokens(self) -> List[Token]:
+        return list(self)
+
+# a source file mapped read-only into memory; pickles as its path so tokens
+# that point into it can be sent to worker processes without the contents.
+# The mapping stays open until close, or the end of a with block, rather
+# than until the last SpanToken over it is collected
+class MappedSource:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                self.buffer: Union[bytes, mmap.mmap] = b''
+            else:
+                self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __reduce__(self):
+        return (MappedSource, (self.path,))
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def decode(self, start: int, end: int) -> str:
+        return self.buffer[start:end].decode()
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+    def __enter__(self) -> 'MappedSource':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+LITERAL_TYPES = frozenset({TokenType.IDENTIFIER, TokenType.NUMBER, TokenType.STRING, TokenType.BOOL})
+
+# a token that only records where its lexeme sits in the source; the literal
+# is decoded from the buffer each time it is read. Pickles as a flat tuple
+# with the source sent once, so a list of them is smaller than the same
+# list of Tokens
+class SpanToken:
+    __slots__ = ('type', 'start', 'end', 'source')
+
+    def __init__(self, type: TokenType, start: int, end: int, source: MappedSource):
+        self.type = type
+        self.start = start
+        self.end = end
+        self.source = source
+
+    def __reduce__(self):
+        return (SpanToken, (self.type, self.start, self.end, self.source))
+
+    @property
+    def offset(self) -> int:
+        return self.start - 1 if self.type == TokenType.STRING else self.start
+
+    @property
+    def value(self) -> Optional[Number]:
+        if self.type != TokenType.NUMBER:
+            return None
+        return number_value(self.source.decode(self.start, self.end))
+
+    @property
+    def literal(self) -> Optional[str]:
+        if self.type not in LITERAL_TYPES:
+            return None
+        return self.source.decode(self.start, self.end)
+
+    def __repr__(self) -> str:
+        if (literal := self.literal) is not None:
+            return f'{self.type} | \'{literal}\''
+        else:
+            return str(self.type)
+
+BYTE_KEYWORDS = {keyword.encode(): type for keyword, type in KEYWORDS.items()}
+BYTE_OPERATORS = {operator.encode(): type for operator, type in OPERATORS.items()}
+BYTE_KEYWORD_LENGTH = max(len(keyword) for keyword in BYTE_KEYWORDS)
+
+# LEXEME_PATTERN over bytes: classes like \w are ASCII-only here, so non-ASCII
+# characters are only accepted inside string literals
+BYTE_LEXEME_PATTERN = re.compile(LEXEME_PATTERN.pattern.encode(), re.VERBOSE | re.DOTALL)
+
+# lexes a file through a read-only mmap without copying lexemes out of it;
+# string spans exclude the quotes, every other span covers the whole lexeme
+class MappedLexer:
+    def __init__(self, source: Union[str, MappedSource]):
+        self.source = MappedSource(source) if isinstance(source, str) else source
+        self.index = 0
+
+    def next_token(self) -> Optional[SpanToken]:
+        buffer = self.source.buffer
+        while (lexeme := BYTE_LEXEME_PATTERN.match(buffer, self.index)) is not None:
+            start, end = lexeme.span()
+            self.index = end
+            match lexeme.lastgroup:
+                case 'SPACE':
+                    continue
+                case 'NAME':
+                    if end - start <= BYTE_KEYWORD_LENGTH:
+                        name = buffer[start:end]
+                        if name == b'true' or name == b'false':
+                            return SpanToken(TokenType.BOOL, start, end, self.source)
+                        if (keyword := BYTE_KEYWORDS.get(name)) is not None:
+                            return SpanToken(keyword, start, end, self.source)
+                    return SpanToken(TokenType.IDENTIFIER, start, end, self.source)
+                case 'OPERATOR':
+                    return SpanToken(BYTE_OPERATORS[buffer[start:end]], start, end, self.source)
+                case 'NUMBER':
+                    try:
+                        number_value(self.source.decode(start, end))
+                    except IllegalLexemeError:
+                        raise IllegalLexemeError(self.source.decode(start, end), start)
+                    return SpanToken(TokenType.NUMBER, start, end, self.source)
+                case 'STRING':
+                    return SpanToken(TokenType.STRING, start + 1, end - 1, self.source)
+                case _:
+                    raise IllegalLexemeError(buffer[start:end].decode(errors='replace'), start)
+        return None
+
+    def build_tokens(self) -> List[SpanToken]:
+        tokens = []
+        while (token := self.next_token()) is not None:
+            tokens.append(token)
+        return tokens
+
+# offsets to cut the source at for parallel lexing: each is a newline outside
+# any string literal (strings are the only lexeme that can span lines), found
+# by keeping the parity of the quotes seen so far
+def split_points(source: str, size: int) -> List[int]:
+    points = [0]
+    inside = False
+    target = size
+    while target < len(source):
+        point = source.find('\n', target)
+        while point != -1 and inside ^ (source.count('"', points[-1], point) % 2 == 1):
+            closing = source.find('"', point)
+            point = source.find('\n', closing) if closing != -1 else -1
+        if point == -1:
+            break
+        inside ^= source.count('"', points[-1], point) % 2 == 1
+        points.append(point)
+        target = point + size
+    points.append(len(source))
+    return points
+
+# tokens as plain tuples, which pickle several times faster than Token
+# objects when they are sent to or from worker processes
+PackedToken = Tuple[int, Optional[str], Optional[int], Optional[Number]]
+
+def pack_tokens(tokens: Iterable[Token]) -> List[PackedToken]:
+    return [(token.type.value, token.literal, token.offset, token.value) for token in tokens]
+
+def unpack_tokens(packed: Iterable[PackedToken]) -> List[Token]:
+    return [Token(TOKEN_TYPES[kind], literal, offset, value) for kind, literal, offset, value in packed]
+
+def lex_slice(source: str, base: int) -> List[PackedToken]:
+    tokens = []
+    lexer = RegexLexer(source)
+    try:
+        while (token := lexer.next_token()) is not None:
+            tokens.append((token.type.value, token.literal, base + cast(int, token.offset), token.value))
+    except IllegalLexemeError as e:
+        raise IllegalLexemeError(e.args[0], base + e.args[1])
+    return tokens
+
+# lexes slices of the source in a process pool and joins them in order; the
+# tokens, offsets and first error are the same as a serial RegexLexer run
+def lex_parallel(source: str, workers: Optional[int]=None, slice_size: int=1 << 22) -> List[Token]:
+    workers = workers or os.cpu_count() or 1
+    size = max(slice_size, -(-len(source) // workers))
+    points = split_points(source, size)
+    if len(points) <= 2:
+        return RegexLexer(source).build_tokens()
+    tokens = []
+    with ProcessPoolExecutor(workers) as pool:
+        slices = (source[start:end] for start, end in zip(points, points[1:]))
+        for part in pool.map(lex_slice, slices, points[:-1]):
+            tokens.extend(unpack_tokens(part))
+    return tokens
+
+# keeps the tokens of a source up to date across text edits by re-lexing only
+# from the token before the edit until the new tokens line up with an old
+# token boundary again; lexing is context-free at token boundaries, so every
+# old token after that point is reused. Offsets of the reused tail are fixed
+# lazily: shifts holds (first token index, delta) pairs not yet applied to
+# self.tokens, which build_tokens folds in
+class IncrementalLexer:
+    def __init__(self, source: str, tokens: Optional[List[Token]]=None):
+        self.input = source
+        self.tokens = tokens if tokens is not None else RegexLexer(source).build_tokens()
+        self.shifts: List[Tuple[int, int]] = []
+
+    def shift(self, index: int) -> int:
+        return sum(delta for first, delta in self.shifts if first <= index)
+
+    def offset(self, index: int) -> int:
+        return cast(int, self.tokens[index].offset) + self.shift(index)
+
+    def find(self, offset: int) -> int:
+        low, high = 0, len(self.tokens)
+        while low < high:
+            middle = (low + high) // 2
+            if self.offset(middle) < offset:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    # replaces deleted characters at offset with inserted; returns the index
+    # of the first replaced token, how many old tokens were dropped and how
+    # many new ones took their place. On IllegalLexemeError nothing changes
+    def edit(self, offset: int, deleted: int, inserted: str) -> Tuple[int, int, int]:
+        source = self.input[:offset] + inserted + self.input[offset + deleted:]
+        delta = len(inserted) - deleted
+        edited = offset + len(inserted)
+        first = max(self.find(offset) - 1, 0)
+        position = min(self.offset(first), offset) if self.tokens else 0
+        base = self.shift(first)
+        resync = len(self.tokens)
+        window = []
+        while (lexeme := LEXEME_PATTERN.match(source, position)) is not None:
+            position = lexeme.end()
+            if (token := lexeme_token(lexeme)) is None:
+                continue
+            start = cast(int, token.offset)
+            if start >= edited:
+                candidate = self.find(start - delta)
+                if candidate < len(self.tokens) and self.offset(candidate) == start - delta:
+                    resync = candidate
+                    break
+            token.offset = start - base
+            window.append(token)
+        self.input = source
+        self.tokens[first:resync] = window
+        moved = len(window) - (resync - first)
+        carried = delta
+        before, after = [], []
+        for at, amount in self.shifts:
+            if at <= first:
+                before.append((at, amount))
+            elif at <= resync:
+                carried += amount
+            else:
+                after.append((at + moved, amount))
+        self.shifts = before + ([(first + len(window), carried)] if carried else []) + after
+        if len(self.shifts) > 32:
+            self.flush()
+        return first, resync - first, len(window)
+
+    def flush(self):
+        bounds = self.shifts + [(len(self.tokens), 0)]
+        total = 0
+        for (start, amount), (end, _) in zip(bounds, bounds[1:]):
+            total += amount
+            for index in range(start, end):
+                self.tokens[index].offset = cast(int, self.tokens[index].offset) + total
+        self.shifts = []
+
+    def build_tokens(self) -> List[Token]:
+        self.flush()
+        return self.tokens
+
+ENGINES: Dict[str, Callable[[str], Union[Lexer, RegexLexer, StreamLexer]]] = {
+    'scan': Lexer,
+    'regex': RegexLexer,
+    'stream': StreamLexer,
+}
\ No newline at end of file
@@ -1,6 +1,6 @@
 # TODO remove __repr__ after the parser is complete
 
-from typing import Optional, List, Dict, Callable, Union, Tuple, cast
+from typing import Optional, List, Dict, Callable, Union, Tuple, Sequence, Iterator, cast
 from enum import Enum, auto
 
 import lex
@@ -8,17 +8,21 @@ import lex
 class UnexpectedTokenError(Exception):
     pass
 
+# offset is the source offset of the token a node starts at, turned into a
+# line and column with lex.LineIndex only when something is reported. Every
+# node class is slotted to keep per-instance memory down
 class Node:
-    pass
+    __slots__ = ('offset',)
+    offset: Optional[int]
 
 class Statement(Node):
-    pass
+    __slots__ = ()
 
 class Expression(Node):
-    pass
+    __slots__ = ()
 
-PrefixParser = Callable[[], Expression]
-InfixParser = Callable[[Expression], Expression]
+PrefixParser = Callable[['Parser'], Expression]
+InfixParser = Callable[['Parser', Expression], Expression]
 
 class Precedence(Enum):
     LOWEST = auto()
@@ -31,13 +35,18 @@ class Precedence(Enum):
     CALL = auto()
 
 class Identifier(Expression):
+    __slots__ = ('value',)
+
     def __init__(self, value: str):
+        self.offset = None
         self.value = value
     
     def __repr__(self) -> str:
         return f'Identifier(EXPR)[Value: {self.value}]'
 
 class Leaf(Expression):
+    __slots__ = ('kind', 'value')
+
     class Kind(Enum):
         IDENTIFIER = auto()
         STRING = auto()
@@ -45,18 +54,19 @@ class Leaf(Expression):
         NUMBER = auto()
 
     def __init__(self, token: lex.Token):
-        self.value = cast(Union[str, bool, float], None)
-        token.literal = cast(str, token.literal) # safe
+        self.offset = None
+        self.value = cast(Union[str, bool, lex.Number], None)
+        literal = cast(str, token.literal) # safe
         match token.type:
+            case lex.TokenType.NUMBER:
+                self.kind = self.Kind.NUMBER
+                self.value = cast(lex.Number, token.value)
             case lex.TokenType.STRING:
                 self.kind = self.Kind.STRING
-                self.value = token.literal
+                self.value = literal
             case lex.TokenType.BOOL:
                 self.kind = self.Kind.BOOL
-                self.value = token.literal == 'true'
-            case lex.TokenType.NUMBER:
-                self.kind = self.Kind.NUMBER
-                self.value = float(token.literal)
+                self.value = literal == 'true'
             case _:
                 raise UnexpectedTokenError(self.Kind, token)
     
@@ -64,11 +74,14 @@ class Leaf(Expression):
         return f'Leaf(EXPR)[Kind: {self.kind}, Value: {self.value}]'
 
 class Unary(Expression):
+    __slots__ = ('operation', 'value')
+
     class Operation(Enum):
         NOT = auto()
         NEGATE = auto()
     
     def __init__(self, operation: Operation, value: Expression):
+        self.offset = None
         self.operation = operation
         self.value = value
     
@@ -76,6 +89,8 @@ class Unary(Expression):
         return f'Unary(EXPR)[Operation: {self.operation}, Value: {self.value}]'
 
 class Binary(Expression):
+    __slots__ = ('left', 'operation', 'right')
+
     class Operation(Enum):
         ADD = auto()
         SUBTRACT = auto()
@@ -92,6 +107,7 @@ class Binary(Expression):
         OR = auto()
     
     def __init__(self, left: Expression, operation: Operation, right: Expression):
+        self.offset = None
         self.left = left
         self.operation = operation
         self.right = right
@@ -100,14 +116,20 @@ class Binary(Expression):
         return f'Binary(EXPR)[Left: {self.left}, Operation: {self.operation}, Right: {self.right}]'
 
 class Block(Expression):
+    __slots__ = ('body',)
+
     def __init__(self, body: List[Statement]):
+        self.offset = None
         self.body = body
     
     def __repr__(self) -> str:
         return f'Block(EXPR)[Body: ({", ".join(str(stmt) for stmt in self.body)})]'
 
 class FunctionCall(Expression):
+    __slots__ = ('callee', 'arguments')
+
     def __init__(self, callee: Expression, arguments: List[Expression]):
+        self.offset = None
         self.callee = callee
         self.arguments = arguments
 
@@ -115,7 +137,10 @@ class FunctionCall(Expression):
         return f'FunctionCall(STMT)[Callee: {self.callee}, Arguments: ({", ".join(str(arg) for arg in self.arguments)})]'
 
 class If(Statement):
+    __slots__ = ('main', 'alternatives', 'fallback')
+
     def __init__(self, main: Tuple[Expression, Block], alternatives: Dict[Expression, Block]={}, fallback: Optional[Block]=None):
+        self.offset = None
         self.main = main
         self.alternatives = alternatives
         self.fallback = fallback
@@ -132,24 +157,48 @@ class If(Statement):
             else:
                 return f'If(STMT)[Main: {self.main}]'
 
+# a LazyParser leaves body unparsed and records in pending the tokens, the
+# index of the opening brace and the parser class to finish it with; the
+# body is parsed on first access, raising any syntax error in it only then
 class FunctionDef(Statement):
-    def __init__(self, name: str, arguments: List[str], body: Block):
+    __slots__ = ('name', 'arguments', 'parsed', 'pending')
+
+    def __init__(self, name: str, arguments: List[str], body: Optional[Block], pending: Optional[Tuple[Sequence[lex.Token], int, Callable[[Sequence[lex.Token]], 'Parser']]]=None):
+        self.offset = None
         self.name = name
         self.arguments = arguments
-        self.body = body
+        self.parsed = body
+        self.pending = pending
+
+    @property
+    def body(self) -> Block:
+        if self.parsed is None:
+            tokens, start, parser = cast(Tuple[Sequence[lex.Token], int, Callable[[Sequence[lex.Token]], Parser]], self.pending)
+            source = parser(tokens)
+            source.index = start
+            source.curr = tokens[start]
+            self.parsed = source.parse_block()
+            self.pending = None
+        return self.parsed
     
     def __repr__(self) -> str:
         return f'FunctionDef(STMT)[Name: {self.name}, Arguments: ({", ".join(self.arguments)}), Body: {self.body}]'
 
 class Wrapper(Statement):
+    __slots__ = ('value',)
+
     def __init__(self, value: Expression):
+        self.offset = None
         self.value = value
     
     def __repr__(self) -> str:
         return f'Wrapper(STMT)[Value: {self.value}]'
 
 class Let(Statement):
+    __slots__ = ('identifier', 'value')
+
     def __init__(self, identifier: str, value: Expression):
+        self.offset = None
         self.identifier = identifier
         self.value = value
 
@@ -157,7 +206,10 @@ class Let(Statement):
         return f'Let(STMT)[Identifier: {self.identifier}, Value: {self.value}]'
 
 class Return(Statement):
+    __slots__ = ('value',)
+
     def __init__(self, value: Optional[Expression]=None):
+        self.offset = None
         self.value = value
 
     def __repr__(self) -> str:
@@ -166,53 +218,67 @@ class Return(Statement):
         else:
             return 'Return(STMT)[]'
 
+# direct children of a node in source order
+def children(node: Node) -> List[Node]:
+    match node:
+        case Unary() | Wrapper() | Let():
+            return [cast(Union[Unary, Wrapper, Let], node).value]
+        case Return():
+            value = cast(Return, node).value
+            return [value] if value is not None else []
+        case Binary():
+            binary = cast(Binary, node)
+            return [binary.left, binary.right]
+        case Block():
+            return list(cast(Block, node).body)
+        case FunctionCall():
+            call = cast(FunctionCall, node)
+            return [call.callee, *call.arguments]
+        case If():
+            branch = cast(If, node)
+            nested = [*branch.main]
+            for condition, consequence in branch.alternatives.items():
+                nested.extend((condition, consequence))
+            if branch.fallback is not None:
+                nested.append(branch.fallback)
+            return nested
+        case FunctionDef():
+            return [cast(FunctionDef, node).body]
+        case _:
+            return []
+
+UNARY_OPERATIONS: Dict[lex.TokenType, Unary.Operation] = {
+    lex.TokenType.BANG: Unary.Operation.NOT,
+    lex.TokenType.DASH: Unary.Operation.NEGATE,
+}
+
+# the operation and binding precedence of every binary operator token, so
+# parse_binary resolves both with one lookup
+BINARY_OPERATIONS: Dict[lex.TokenType, Tuple[Binary.Operation, Precedence]] = {
+    lex.TokenType.PLUS: (Binary.Operation.ADD, Precedence.SUM),
+    lex.TokenType.DASH: (Binary.Operation.SUBTRACT, Precedence.SUM),
+    lex.TokenType.ASTERISK: (Binary.Operation.MULTIPLY, Precedence.PRODUCT),
+    lex.TokenType.SLASH: (Binary.Operation.DIVIDE, Precedence.PRODUCT),
+    lex.TokenType.MODULUS: (Binary.Operation.MODULO, Precedence.PRODUCT),
+    lex.TokenType.LESS: (Binary.Operation.LESS, Precedence.LESSGREATER),
+    lex.TokenType.GREATER: (Binary.Operation.GREATER, Precedence.LESSGREATER),
+    lex.TokenType.LESS_EQUAL: (Binary.Operation.LESS_EQUAL, Precedence.LESSGREATER),
+    lex.TokenType.GREATER_EQUAL: (Binary.Operation.GREATER_EQUAL, Precedence.LESSGREATER),
+    lex.TokenType.EQUAL: (Binary.Operation.EQUAL, Precedence.EQUALS),
+    lex.TokenType.BANG_EQUAL: (Binary.Operation.NOT_EQUAL, Precedence.EQUALS),
+    lex.TokenType.AND: (Binary.Operation.AND, Precedence.LOGICAL),
+    lex.TokenType.OR: (Binary.Operation.OR, Precedence.LOGICAL),
+}
+
 class Parser:
-    def __init__(self, source: List[lex.Token]):
+    def __init__(self, source: Sequence[lex.Token]):
+        self.reset(source)
+
+    # points the parser at a new token stream so one instance can be reused
+    def reset(self, source: Sequence[lex.Token]):
         self.input = source
         self.index = -1
         self.curr = cast(lex.Token, None)
-        self.prefix_parsers: Dict[lex.TokenType, PrefixParser] = {
-            lex.TokenType.IDENTIFIER: self.parse_identifier,
-            lex.TokenType.STRING: self.parse_leaf,
-            lex.TokenType.BOOL: self.parse_leaf,
-            lex.TokenType.NUMBER: self.parse_leaf,
-            lex.TokenType.BANG: self.parse_unary,
-            lex.TokenType.DASH: self.parse_unary,
-            lex.TokenType.LEFT_PARENTHESIS: self.parse_grouped,
-            lex.TokenType.LEFT_CURLY: self.parse_block,
-        }
-        self.infix_parsers: Dict[lex.TokenType, InfixParser] = {
-            lex.TokenType.PLUS: self.parse_binary,
-            lex.TokenType.DASH: self.parse_binary,
-            lex.TokenType.ASTERISK: self.parse_binary,
-            lex.TokenType.SLASH: self.parse_binary,
-            lex.TokenType.MODULUS: self.parse_binary,
-            lex.TokenType.LESS: self.parse_binary,
-            lex.TokenType.GREATER: self.parse_binary,
-            lex.TokenType.LESS_EQUAL: self.parse_binary,
-            lex.TokenType.GREATER_EQUAL: self.parse_binary,
-            lex.TokenType.EQUAL: self.parse_binary,
-            lex.TokenType.BANG_EQUAL: self.parse_binary,
-            lex.TokenType.AND: self.parse_binary,
-            lex.TokenType.OR: self.parse_binary,
-            lex.TokenType.LEFT_PARENTHESIS: self.parse_fn_call,
-        }
-        self.infix_precedences = {
-            lex.TokenType.EQUAL: Precedence.EQUALS,
-            lex.TokenType.BANG_EQUAL: Precedence.EQUALS,
-            lex.TokenType.LESS: Precedence.LESSGREATER,
-            lex.TokenType.GREATER: Precedence.LESSGREATER,
-            lex.TokenType.LESS_EQUAL: Precedence.LESSGREATER,
-            lex.TokenType.GREATER_EQUAL: Precedence.LESSGREATER,
-            lex.TokenType.PLUS: Precedence.SUM,
-            lex.TokenType.DASH: Precedence.SUM,
-            lex.TokenType.SLASH: Precedence.PRODUCT,
-            lex.TokenType.ASTERISK: Precedence.PRODUCT,
-            lex.TokenType.MODULUS: Precedence.PRODUCT,
-            lex.TokenType.AND: Precedence.LOGICAL,
-            lex.TokenType.OR: Precedence.LOGICAL,
-            lex.TokenType.LEFT_PARENTHESIS: Precedence.CALL,
-        }
 
     def advance(self) -> bool:
         if self.index + 1 < len(self.input):
@@ -264,7 +330,9 @@ class Parser:
         prefix = self.prefix_parsers.get(self.curr.type)
         if prefix is None:
             raise UnexpectedTokenError(Expression, self.curr)
-        left = prefix()
+        offset = self.curr.offset
+        left = prefix(self)
+        left.offset = offset
         while True:
             if (peek := self.peek()) is None or peek.type == lex.TokenType.SEMICOLON or precedence.value >= self.get_peek_precedence().value:
                 break
@@ -272,7 +340,8 @@ class Parser:
             if infix is None:
                 break
             self.consume()
-            left = infix(left)
+            left = infix(self, left)
+            left.offset = offset
         return left
     
     def parse_identifier(self) -> Identifier:
@@ -282,49 +351,15 @@ class Parser:
         return Leaf(self.curr)
     
     def parse_unary(self) -> Unary:
-        operation = None
-        match self.curr.type:
-            case lex.TokenType.BANG:
-                operation = Unary.Operation.NOT
-            case lex.TokenType.DASH:
-                operation = Unary.Operation.NEGATE
-            case _:
-                raise ValueError(f'UNREACHABLE [{self.curr}] @ Parser.parse_unary')
+        if (operation := UNARY_OPERATIONS.get(self.curr.type)) is None:
+            raise ValueError(f'UNREACHABLE [{self.curr}] @ Parser.parse_unary')
         self.consume()
         return Unary(operation, self.parse_expression(Precedence.PREFIX))
     
     def parse_binary(self, left: Expression) -> Binary:
-        operation = None
-        match self.curr.type:
-            case lex.TokenType.PLUS:
-                operation = Binary.Operation.ADD
-            case lex.TokenType.DASH:
-                operation = Binary.Operation.SUBTRACT
-            case lex.TokenType.ASTERISK:
-                operation = Binary.Operation.MULTIPLY
-            case lex.TokenType.SLASH:
-                operation = Binary.Operation.DIVIDE
-            case lex.TokenType.MODULUS:
-                operation = Binary.Operation.MODULO
-            case lex.TokenType.LESS:
-                operation = Binary.Operation.LESS
-            case lex.TokenType.GREATER:
-                operation = Binary.Operation.GREATER
-            case lex.TokenType.LESS_EQUAL:
-                operation = Binary.Operation.LESS_EQUAL
-            case lex.TokenType.GREATER_EQUAL:
-                operation = Binary.Operation.GREATER_EQUAL
-            case lex.TokenType.EQUAL:
-                operation = Binary.Operation.EQUAL
-            case lex.TokenType.BANG_EQUAL:
-                operation = Binary.Operation.NOT_EQUAL
-            case lex.TokenType.AND:
-                operation = Binary.Operation.AND
-            case lex.TokenType.OR:
-                operation = Binary.Operation.OR
-            case _:
-                raise ValueError(f'UNREACHABLE [{self.curr}] @ Parser.parse_binary')
-        precedence = self.get_current_precedence()
+        if (record := BINARY_OPERATIONS.get(self.curr.type)) is None:
+            raise ValueError(f'UNREACHABLE [{self.curr}] @ Parser.parse_binary')
+        operation, precedence = record
         self.consume()
         right = self.parse_expression(precedence)
         return Binary(left, operation, right)
@@ -359,14 +394,24 @@ class Parser:
         return FunctionCall(left, args)
 
     def parse_statement(self) -> Optional[Statement]:
+        offset = self.curr.offset
         match self.curr.type:
-            case lex.TokenType.KEYWORD_IF: return self.parse_if()
-            case lex.TokenType.KEYWORD_RETURN: return self.parse_return()
-            case lex.TokenType.KEYWORD_LET: return self.parse_let()
-            case lex.TokenType.KEYWORD_FN: return self.parse_fn_def()
-            case _: return self.parse_wrapper()
+            case lex.TokenType.KEYWORD_IF: statement = self.parse_if()
+            case lex.TokenType.KEYWORD_RETURN: statement = self.parse_return()
+            case lex.TokenType.KEYWORD_LET: statement = self.parse_let()
+            case lex.TokenType.KEYWORD_FN: statement = self.parse_fn_def()
+            case _: statement = self.parse_wrapper()
+        statement.offset = offset
+        return statement
     
     def parse_fn_def(self) -> FunctionDef:
+        name, args = self.parse_fn_signature()
+        self.expect(lex.TokenType.LEFT_CURLY)
+        body = self.parse_block()
+        self.expect(lex.TokenType.SEMICOLON)
+        return FunctionDef(name, args, body)
+
+    def parse_fn_signature(self) -> Tuple[str, List[str]]:
         name = cast(str, self.expect(lex.TokenType.IDENTIFIER).literal)
         self.expect(lex.TokenType.LEFT_PARENTHESIS)
         args = []
@@ -378,10 +423,7 @@ class Parser:
                 break
             self.expect_current(lex.TokenType.COMMA)
             self.consume()
-        self.expect(lex.TokenType.LEFT_CURLY)
-        body = self.parse_block()
-        self.expect(lex.TokenType.SEMICOLON)
-        return FunctionDef(name, args, body)
+        return name, args
 
     def parse_if(self) -> If:
         self.consume()
@@ -427,12 +469,424 @@ class Parser:
         self.expect(lex.TokenType.SEMICOLON)
         return statement
     
-    def build_tree(self) -> List[Statement]:
-        statements = []
+    # token kind -> parser method, built once with the class instead of as
+    # bound methods on every instance
+    prefix_parsers: Dict[lex.TokenType, PrefixParser] = {
+        lex.TokenType.IDENTIFIER: parse_identifier,
+        lex.TokenType.STRING: parse_leaf,
+        lex.TokenType.BOOL: parse_leaf,
+        lex.TokenType.NUMBER: parse_leaf,
+        lex.TokenType.BANG: parse_unary,
+        lex.TokenType.DASH: parse_unary,
+        lex.TokenType.LEFT_PARENTHESIS: parse_grouped,
+        lex.TokenType.LEFT_CURLY: parse_block,
+    }
+    infix_parsers: Dict[lex.TokenType, InfixParser] = {
+        lex.TokenType.PLUS: parse_binary,
+        lex.TokenType.DASH: parse_binary,
+        lex.TokenType.ASTERISK: parse_binary,
+        lex.TokenType.SLASH: parse_binary,
+        lex.TokenType.MODULUS: parse_binary,
+        lex.TokenType.LESS: parse_binary,
+        lex.TokenType.GREATER: parse_binary,
+        lex.TokenType.LESS_EQUAL: parse_binary,
+        lex.TokenType.GREATER_EQUAL: parse_binary,
+        lex.TokenType.EQUAL: parse_binary,
+        lex.TokenType.BANG_EQUAL: parse_binary,
+        lex.TokenType.AND: parse_binary,
+        lex.TokenType.OR: parse_binary,
+        lex.TokenType.LEFT_PARENTHESIS: parse_fn_call,
+    }
+    # binary precedences come from BINARY_OPERATIONS, which parse_binary
+    # reads too, so the two cannot drift apart
+    infix_precedences: Dict[lex.TokenType, Precedence] = {
+        **{kind: precedence for kind, (_, precedence) in BINARY_OPERATIONS.items()},
+        lex.TokenType.LEFT_PARENTHESIS: Precedence.CALL,
+    }
+
+    # yields each top-level statement as soon as its closing token has been
+    # consumed, so a consumer can drop it before the next one is parsed
+    def statements(self) -> Iterator[Statement]:
         if not self.advance():
-            return []
+            return
         while (statement := self.parse_statement()) is not None:
-            statements.append(statement)
+            yield statement
             if not self.advance():
-                return statements
-        return statements
\ No newline at end of file
+                return
+
+    def build_tree(self) -> List[Statement]:
+        return list(self.statements())
+
+# Parser over a lex.TokenBuffer that reads its columns directly rather than
+# through TokenBuffer.__getitem__ for every advance and peek; the Token at a
+# position is built once, when it is first peeked at or reached
+class BufferParser(Parser):
+    def reset(self, source: Sequence[lex.Token]):
+        super().reset(source)
+        buffer = cast(lex.TokenBuffer, source)
+        self.kinds, self.starts, self.literals, self.table = buffer.kinds, buffer.starts, buffer.literals, buffer.table
+        self.length = len(buffer)
+        self.built = -1
+        self.token = cast(lex.Token, None)
+
+    def build(self, index: int) -> lex.Token:
+        type, literal = lex.TOKEN_TYPES[self.kinds[index]], self.literals[index]
+        value = cast(lex.TokenBuffer, self.input).value(literal) if type == lex.TokenType.NUMBER else None
+        self.token = lex.Token(type, self.table[literal], self.starts[index], value)
+        self.built = index
+        return self.token
+
+    def advance(self) -> bool:
+        index = self.index + 1
+        if index < self.length:
+            self.index = index
+            self.curr = self.token if index == self.built else self.build(index)
+            return True
+        return False
+
+    def peek(self, count: int=1) -> Optional[lex.Token]:
+        index = self.index + count
+        if 0 <= index < self.length:
+            return self.token if index == self.built else self.build(index)
+        return None
+
+class Continuation(Enum):
+    EXPRESSION = auto()
+    UNARY = auto()
+    GROUP = auto()
+    BINARY = auto()
+    CALL = auto()
+
+# builds the same trees as Parser, but parse_expression keeps its pending
+# work on an explicit stack instead of recursing through parse_unary,
+# parse_grouped, parse_binary and parse_fn_call, so nesting depth is bounded
+# by memory rather than the recursion limit. Each stack entry is a
+# continuation tag followed by its state:
+#   EXPRESSION precedence, offset   runs the infix loop once its operand is ready
+#   UNARY      operation            wraps the operand
+#   GROUP                           expects the closing parenthesis
+#   BINARY     left, operation      combines left with the right operand
+#   CALL       callee, arguments    collects one argument, then the next
+# Blocks inside expressions still parse their statements recursively
+class IterativeParser(Parser):
+    def parse_expression(self, precedence: Precedence=Precedence.LOWEST) -> Expression:
+        stack: List[tuple] = []
+        result = cast(Expression, None)
+        starting = True
+        while True:
+            if starting:
+                kind = self.curr.type
+                prefix = self.prefix_parsers.get(kind)
+                if prefix is None:
+                    raise UnexpectedTokenError(Expression, self.curr)
+                stack.append((Continuation.EXPRESSION, precedence, self.curr.offset))
+                if (operation := UNARY_OPERATIONS.get(kind)) is not None:
+                    stack.append((Continuation.UNARY, operation))
+                    self.consume()
+                    precedence = Precedence.PREFIX
+                    continue
+                if kind == lex.TokenType.LEFT_PARENTHESIS:
+                    stack.append((Continuation.GROUP,))
+                    self.consume()
+                    precedence = Precedence.LOWEST
+                    continue
+                result = prefix(self)
+                starting = False
+            frame = stack.pop()
+            match frame[0]:
+                case Continuation.UNARY:
+                    result = Unary(frame[1], result)
+                case Continuation.GROUP:
+                    self.expect(lex.TokenType.RIGHT_PARENTHESIS)
+                case Continuation.BINARY:
+                    result = Binary(frame[1], frame[2], result)
+                case Continuation.CALL:
+                    _, callee, arguments = frame
+                    arguments.append(result)
+                    if not self.match(lex.TokenType.COMMA):
+                        self.expect(lex.TokenType.RIGHT_PARENTHESIS)
+                        result = FunctionCall(callee, arguments)
+                        continue
+                    self.consume()
+                    if self.curr.type == lex.TokenType.RIGHT_PARENTHESIS:
+                        result = FunctionCall(callee, arguments)
+                        continue
+                    stack.append(frame)
+                    precedence = Precedence.LOWEST
+                    starting = True
+                case Continuation.EXPRESSION:
+                    _, outer, offset = frame
+                    result.offset = offset
+                    if (peek := self.peek()) is None or peek.type == lex.TokenType.SEMICOLON or outer.value >= self.get_peek_precedence().value \
+                            or (infix := self.infix_parsers.get(peek.type)) is None:
+                        if not stack:
+                            return result
+                        continue
+                    self.consume()
+                    stack.append(frame)
+                    if (record := BINARY_OPERATIONS.get(self.curr.type)) is not None:
+                        stack.append((Continuation.BINARY, result, record[0]))
+                        self.consume()
+                        precedence = record[1]
+                        starting = True
+                    elif infix == Parser.parse_fn_call:
+                        self.consume()
+                        if self.curr.type == lex.TokenType.RIGHT_PARENTHESIS:
+                            result = FunctionCall(result, [])
+                        else:
+                            stack.append((Continuation.CALL, result, []))
+                            precedence = Precedence.LOWEST
+                            starting = True
+                    else:
+                        result = infix(self, result)
+
+
+# defers every fn body: the pre-parse only matches braces over the tokens to
+# find where the body ends, and FunctionDef.body parses it on first access
+class LazyParser(Parser):
+    def parse_fn_def(self) -> FunctionDef:
+        name, args = self.parse_fn_signature()
+        self.expect(lex.TokenType.LEFT_CURLY)
+        start = self.index
+        self.skip_block()
+        self.expect(lex.TokenType.SEMICOLON)
+        return FunctionDef(name, args, None, (self.input, start, type(self)))
+
+    # moves to the brace closing the block opened at the current token
+    def skip_block(self):
+        tokens, index, depth = self.input, self.index, 1
+        while depth > 0:
+            index += 1
+            if index >= len(tokens):
+                raise UnexpectedTokenError(lex.Token, None)
+            kind = tokens[index].type
+            if kind == lex.TokenType.LEFT_CURLY:
+                depth += 1
+            elif kind == lex.TokenType.RIGHT_CURLY:
+                depth -= 1
+        self.index = index
+        self.curr = tokens[index]
+
+# tokens a statement can start with, used to resynchronise after an error
+STATEMENT_KEYWORDS = {
+    lex.TokenType.KEYWORD_IF,
+    lex.TokenType.KEYWORD_RETURN,
+    lex.TokenType.KEYWORD_LET,
+    lex.TokenType.KEYWORD_FN,
+}
+
+# collects every UnexpectedTokenError instead of stopping at the first one.
+# A statement that fails is dropped from the tree and parsing resumes after
+# its ';', before a '}' closing the enclosing block, or before the next
+# statement keyword, so the tree holds every statement that did parse. Only
+# the failure path does extra work: Parser itself is untouched and a try
+# block costs nothing until something is raised
+class RecoveringParser(Parser):
+    def reset(self, source: Sequence[lex.Token]):
+        super().reset(source)
+        self.errors: List[UnexpectedTokenError] = []
+        self.depth = 0
+
+    # once the input has run out every enclosing statement fails at its
+    # end too, so only the first of those is kept
+    def report(self, error: UnexpectedTokenError):
+        if self.errors and self.index + 1 >= len(self.input) and self.errors[-1].args[1] in (None, self.curr):
+            return
+        self.errors.append(error)
+
+    # leaves the current token on the last one of the failed statement,
+    # where every caller expects a statement to end
+    def synchronize(self, start: int):
+        tokens, index, depth = self.input, max(self.index, start), 0
+        while index < len(tokens):
+            kind = tokens[index].type
+            if kind == lex.TokenType.LEFT_CURLY:
+                depth += 1
+            elif kind == lex.TokenType.RIGHT_CURLY:
+                if depth > 0:
+                    depth -= 1
+                elif self.depth > 0 and index > start:
+                    index -= 1
+                    break
+            elif depth == 0:
+                if kind == lex.TokenType.SEMICOLON:
+                    break
+                if kind in STATEMENT_KEYWORDS and index > start:
+                    index -= 1
+                    break
+            index += 1
+        self.index = min(index, len(tokens) - 1)
+        self.curr = tokens[self.index]
+
+    def parse_statement(self) -> Optional[Statement]:
+        start = self.index
+        try:
+            return super().parse_statement()
+        except UnexpectedTokenError as error:
+            self.report(error)
+            self.synchronize(start)
+            return None
+
+    def parse_block(self) -> Block:
+        statements = []
+        self.depth += 1
+        while True:
+            if not self.advance():
+                self.report(UnexpectedTokenError(lex.TokenType.RIGHT_CURLY, None))
+                break
+            if self.curr.type == lex.TokenType.RIGHT_CURLY:
+                break
+            if (statement := self.parse_statement()) is not None:
+                statements.append(statement)
+        self.depth -= 1
+        return Block(statements)
+
+    # block expressions dispatch through the class table, which would
+    # otherwise reach Parser.parse_block and skip the depth tracking
+    prefix_parsers: Dict[lex.TokenType, PrefixParser] = {
+        **Parser.prefix_parsers,
+        lex.TokenType.LEFT_CURLY: parse_block,
+    }
+
+    def statements(self) -> Iterator[Statement]:
+        while self.advance():
+            if (statement := self.parse_statement()) is not None:
+                yield statement
+
+
+# indices just past every top-level statement: a statement ends at a ';'
+# outside all braces, which holds for every statement kind in the grammar
+def statement_boundaries(tokens: Sequence[lex.Token]) -> List[int]:
+    boundaries = []
+    depth = 0
+    for index, token in enumerate(tokens):
+        kind = token.type
+        if kind == lex.TokenType.LEFT_CURLY:
+            depth += 1
+        elif kind == lex.TokenType.RIGHT_CURLY:
+            depth -= 1
+        elif kind == lex.TokenType.SEMICOLON and depth == 0:
+            boundaries.append(index + 1)
+    if not boundaries or boundaries[-1] != len(tokens):
+        boundaries.append(len(tokens))
+    return boundaries
+
+# moves every node offset in a subtree by delta
+def shift_offsets(node: Node, delta: int):
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if node.offset is not None:
+            node.offset += delta
+        pending.extend(children(node))
+
+# the tokens of an IncrementalLexer with its deferred shifts applied, less
+# base, built one at a time as the parser reads them
+class ShiftedTokens(Sequence[lex.Token]):
+    def __init__(self, lexer: lex.IncrementalLexer, base: int):
+        self.lexer = lexer
+        self.base = base
+
+    def __len__(self) -> int:
+        return len(self.lexer.tokens)
+
+    def __getitem__(self, index: int) -> lex.Token: # type: ignore[override]
+        token = self.lexer.tokens[index]
+        return lex.Token(token.type, token.literal, self.lexer.offset(index) - self.base, token.value)
+
+# keeps a tree in step with an IncrementalLexer. An edit parses again only
+# from the top-level statement holding the first changed token up to the
+# first statement that ends on an old boundary past the edit; every other
+# statement is kept as the same object. Like the lexer it defers moving
+# what follows an edit: shifts holds (statement index, token delta, offset
+# delta) runs, applied to bounds and node offsets by flush. On a syntax
+# error the edit is undone in the lexer too and nothing changes
+class IncrementalParser:
+    def __init__(self, source: str):
+        self.lexer = lex.IncrementalLexer(source)
+        self.statements = Parser(self.lexer.tokens).build_tree()
+        self.bounds = statement_boundaries(self.lexer.tokens)[:len(self.statements)]
+        self.shifts: List[Tuple[int, int, int]] = []
+
+    def shift(self, index: int) -> Tuple[int, int]:
+        tokens = characters = 0
+        for first, moved, delta in self.shifts:
+            if first <= index:
+                tokens += moved
+                characters += delta
+        return tokens, characters
+
+    def bound(self, index: int) -> int:
+        return self.bounds[index] + self.shift(index)[0]
+
+    # index of the statement holding the token at index
+    def find(self, index: int) -> int:
+        low, high = 0, len(self.bounds)
+        while low < high:
+            middle = (low + high) // 2
+            if self.bound(middle) <= index:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    # same arguments as IncrementalLexer.edit; returns the index of the first
+    # replaced statement, how many old statements were dropped and how many
+    # new ones took their place
+    def edit(self, offset: int, deleted: int, inserted: str) -> Tuple[int, int, int]:
+        original = self.lexer.input[offset:offset + deleted]
+        first, removed, added = self.lexer.edit(offset, deleted, inserted)
+        moved = added - removed
+        start = self.find(first)
+        tokens, characters = self.shift(start)
+        parser = Parser(ShiftedTokens(self.lexer, characters))
+        parser.index = self.bound(start - 1) - 1 if start > 0 else -1
+        resync = len(self.statements)
+        statements, bounds = [], []
+        try:
+            while parser.advance():
+                statements.append(cast(Statement, parser.parse_statement()))
+                end = parser.index + 1
+                bounds.append(end - tokens)
+                if end >= first + added:
+                    candidate = self.find(end - moved - 1)
+                    if candidate < len(self.bounds) and self.bound(candidate) == end - moved:
+                        resync = candidate + 1
+                        break
+        except UnexpectedTokenError:
+            self.lexer.edit(offset, len(inserted), original)
+            raise
+        self.statements[start:resync] = statements
+        self.bounds[start:resync] = bounds
+        grown = len(statements) - (resync - start)
+        carried_tokens, carried_characters = moved, len(inserted) - deleted
+        before, after = [], []
+        for at, amount, delta in self.shifts:
+            if at <= start:
+                before.append((at, amount, delta))
+            elif at <= resync:
+                carried_tokens += amount
+                carried_characters += delta
+            else:
+                after.append((at + grown, amount, delta))
+        carried = [(start + len(statements), carried_tokens, carried_characters)] if carried_tokens or carried_characters else []
+        self.shifts = before + carried + after
+        if len(self.shifts) > 32:
+            self.flush()
+        return start, resync - start, len(statements)
+
+    def flush(self):
+        bounds = self.shifts + [(len(self.statements), 0, 0)]
+        tokens = characters = 0
+        for (start, moved, delta), (end, _, _) in zip(bounds, bounds[1:]):
+            tokens += moved
+            characters += delta
+            for index in range(start, end):
+                self.bounds[index] += tokens
+                if characters:
+                    shift_offsets(self.statements[index], characters)
+        self.shifts = []
+
+    def build_tree(self) -> List[Statement]:
+        self.flush()
+        return self.statements
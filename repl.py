@@ -1,28 +1,37 @@
-from typing import List, cast
+from typing import Optional, cast
 import sys
 
 import lex
 import parse
-import codegen
+import cache
+
+def describe(lines: lex.LineIndex, offset: Optional[int]) -> str:
+    if offset is None:
+        return ''
+    line, column = lines.location(offset)
+    return f' at {line}:{column}'
 
 def main():
+    compiled = cache.CompileCache()
     while True:
         source = input('> ')
         if source == 'exit':
             raise SystemExit
-        tokens = cast(List[lex.Token], None)
+        lines = lex.LineIndex(source)
         try:
-            tokens = lex.Lexer(source).build_tokens()
+            code = compiled.compile(source)
         except lex.IllegalLexemeError as e:
-            print(f'Invalid lexeme \'{e.args[0]}\'')
+            print(f'Invalid lexeme \'{e.args[0]}\'{describe(lines, e.args[1] if len(e.args) > 1 else None)}')
             continue
-        syntax_tree = cast(List[parse.Statement], None)
-        try:
-            syntax_tree = parse.Parser(tokens).build_tree()
-        except parse.UnexpectedTokenError as e:
-            print(f'Expected {e.args[0]}, got {e.args[1]} instead')
+        except parse.UnexpectedTokenError:
+            # compiled again only on failure, so every syntax error is
+            # reported in one go without slowing the error-free path
+            recovering = parse.RecoveringParser(lex.RegexLexer(source).build_tokens())
+            recovering.build_tree()
+            for e in recovering.errors:
+                got = cast(Optional[lex.Token], e.args[1])
+                print(f'Expected {e.args[0]}, got {got} instead{describe(lines, got.offset if got is not None else None)}')
             continue
-        code = codegen.Codegen(syntax_tree).build_bytecode()
         print(code)
 
 if __name__ == '__main__':
@@ -0,0 +1,201 @@
+from typing import List, Dict, Tuple, Callable, Sequence, Union, Any
+import operator
+
+import bytecode
+import image
+
+class ExecutionError(Exception):
+    pass
+
+# raised by EXIT, and by RETURN outside any fn, to leave the dispatch loop
+class Halt(Exception):
+    pass
+
+Handler = Callable[['VM', int], None]
+
+# handlers indexed by opcode number; numbers with no opcode behind them
+# get illegal
+def table(handlers: Dict[bytecode.Opcode, Handler], illegal: Handler) -> List[Handler]:
+    indexed = [illegal] * (max(opcode.value for opcode in bytecode.Opcode) + 1)
+    for opcode, handler in handlers.items():
+        indexed[opcode.value] = handler
+    return indexed
+
+def binary(apply: Callable[[Any, Any], Any]) -> Handler:
+    def handler(vm: 'VM', _: int):
+        stack = vm.stack
+        sp = vm.sp - 1
+        stack[sp - 1] = apply(stack[sp - 1], stack[sp])
+        vm.sp = sp
+    return handler
+
+# stands in for a constant not yet read from the pool
+MISSING = object()
+
+# runs packed code (see bytecode.pack) straight from its bytes, so jump
+# targets and Function entries count units; opcodes and operands are
+# strided views over the code rather than decoded copies, and an image's
+# pool entries are only decoded when first pushed or loaded. An image must
+# stay open while a VM over it is alive. Values live in a preallocated
+# stack indexed by sp; a call saves the return unit, the caller's locals
+# and the stack height to return to, and LOAD falls back from a fn's
+# locals to the globals. Calls nest at most depth frames deep
+class VM:
+    def __init__(self, program: Union[bytecode.Packed, image.Image], globals: Dict[str, Any]={}, size: int=1 << 16, depth: int=1 << 12):
+        data, packed = (program.data, program.code) if isinstance(program, image.Image) else program
+        self.data = data
+        self.constants: List[Any] = data if isinstance(data, list) else [MISSING] * len(data)
+        code = memoryview(packed)
+        self.opcodes = code[0::2]
+        self.operands = code[1::2]
+        self.stack: List[Any] = [None] * size
+        self.sp = 0
+        self.pc = 0
+        self.globals = dict(globals)
+        self.locals = self.globals
+        self.frames: List[Tuple[int, Dict[str, Any], int]] = []
+        self.depth = depth
+
+    def constant(self, operand: int) -> Any:
+        if (value := self.constants[operand]) is MISSING:
+            value = self.constants[operand] = self.data[operand]
+        return value
+
+    def pop(self) -> Any:
+        self.sp -= 1
+        return self.stack[self.sp]
+
+    def illegal(self, _: int):
+        raise ExecutionError('illegal opcode', self.opcodes[self.pc - 1], self.pc - 1)
+
+    # gathers the operand bytes of any further prefixes and runs the
+    # instruction they belong to, so only wide operands pay for them
+    def extended(self, operand: int):
+        pc = self.pc
+        while self.opcodes[pc] == bytecode.Opcode.EXTENDED.value:
+            operand = operand << 8 | self.operands[pc]
+            pc += 1
+        self.pc = pc + 1
+        self.handlers[self.opcodes[pc]](self, operand << 8 | self.operands[pc])
+
+    def exit(self, operand: int):
+        raise Halt(operand)
+
+    def return_(self, _: int):
+        value = self.pop()
+        if not self.frames:
+            raise Halt(value)
+        # operands a return left mid-expression are dropped with the frame
+        self.pc, self.locals, sp = self.frames.pop()
+        self.stack[sp] = value
+        self.sp = sp + 1
+
+    def push(self, operand: int):
+        self.stack[self.sp] = self.constant(operand)
+        self.sp += 1
+
+    def load(self, operand: int):
+        name = self.constant(operand)
+        if name in self.locals:
+            self.stack[self.sp] = self.locals[name]
+        elif name in self.globals:
+            self.stack[self.sp] = self.globals[name]
+        else:
+            raise ExecutionError('undefined name', name)
+        self.sp += 1
+
+    def store(self, operand: int):
+        self.sp -= 1
+        self.locals[self.constant(operand)] = self.stack[self.sp]
+
+    # a Function runs in the VM; anything else callable, such as a builtin
+    # passed in globals, is called directly
+    def call(self, operand: int):
+        stack = self.stack
+        sp = self.sp - 1 - operand
+        callee = stack[sp + operand]
+        arguments = stack[sp:sp + operand]
+        self.sp = sp
+        if isinstance(callee, bytecode.Function):
+            if len(callee.arguments) != operand:
+                raise ExecutionError('wrong argument count', callee.name, operand)
+            if len(self.frames) >= self.depth:
+                raise ExecutionError('call stack overflow', self.depth)
+            self.frames.append((self.pc, self.locals, sp))
+            self.locals = dict(zip(callee.arguments, arguments))
+            self.pc = callee.entry
+        elif callable(callee):
+            stack[sp] = callee(*arguments)
+            self.sp = sp + 1
+        else:
+            raise ExecutionError('not callable', callee)
+
+    def not_(self, _: int):
+        self.stack[self.sp - 1] = not self.stack[self.sp - 1]
+
+    def negate(self, _: int):
+        self.stack[self.sp - 1] = -self.stack[self.sp - 1]
+
+    def discard(self, _: int):
+        self.sp -= 1
+
+    def duplicate(self, _: int):
+        self.stack[self.sp] = self.stack[self.sp - 1]
+        self.sp += 1
+
+    def jump(self, operand: int):
+        self.pc = operand
+
+    def jump_if_false(self, operand: int):
+        self.sp -= 1
+        if not self.stack[self.sp]:
+            self.pc = operand
+
+    handlers: List[Handler] = table({
+        bytecode.Opcode.EXIT: exit,
+        bytecode.Opcode.RETURN: return_,
+        bytecode.Opcode.NOT: not_,
+        bytecode.Opcode.NEGATE: negate,
+        bytecode.Opcode.PUSH: push,
+        bytecode.Opcode.LOAD: load,
+        bytecode.Opcode.STORE: store,
+        bytecode.Opcode.CALL: call,
+        bytecode.Opcode.POP: discard,
+        bytecode.Opcode.DUPLICATE: duplicate,
+        bytecode.Opcode.JUMP: jump,
+        bytecode.Opcode.JUMP_IF_FALSE: jump_if_false,
+        bytecode.Opcode.ADD: binary(operator.add),
+        bytecode.Opcode.SUBTRACT: binary(operator.sub),
+        bytecode.Opcode.MULTIPLY: binary(operator.mul),
+        bytecode.Opcode.DIVIDE: binary(operator.truediv),
+        bytecode.Opcode.MODULO: binary(operator.mod),
+        bytecode.Opcode.LESS: binary(operator.lt),
+        bytecode.Opcode.GREATER: binary(operator.gt),
+        bytecode.Opcode.LESS_EQUAL: binary(operator.le),
+        bytecode.Opcode.GREATER_EQUAL: binary(operator.ge),
+        bytecode.Opcode.EQUAL: binary(operator.eq),
+        bytecode.Opcode.NOT_EQUAL: binary(operator.ne),
+        bytecode.Opcode.EXTENDED: extended,
+    }, illegal)
+
+    # runs until EXIT, or RETURN outside any fn, and gives its operand or
+    # value
+    def run(self) -> Any:
+        # the loop reads these every instruction, so they are bound once
+        handlers: Sequence[Handler] = self.handlers
+        opcodes = self.opcodes
+        operands = self.operands
+        try:
+            while True:
+                pc = self.pc
+                self.pc = pc + 1
+                handlers[opcodes[pc]](self, operands[pc])
+        except Halt as halt:
+            return halt.args[0]
+        except IndexError:
+            if self.sp >= len(self.stack):
+                raise ExecutionError('value stack overflow', len(self.stack))
+            raise
+
+def execute(program: bytecode.Bytecode, globals: Dict[str, Any]={}) -> Any:
+    return VM(bytecode.pack(program), globals).run()